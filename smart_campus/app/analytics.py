@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from datetime import timedelta
+
+from .models import (
+    Beacon, UserVisitedBeacons,
+    VisitRollup, BeaconVisitRollup, StationVisitRollup
+)
+
+
+BEACON_ROLLUP_SQL = """
+    INSERT INTO {rollup} (period, start, beacon_id, visits, visitors)
+    SELECT %s, date_trunc(%s, visit.timestamp), visit.beacon_id,
+           count(*), count(DISTINCT visit.user_id)
+    FROM {visits} AS visit
+    WHERE visit.timestamp >= %s
+    GROUP BY 2, 3
+"""
+
+STATION_ROLLUP_SQL = """
+    INSERT INTO {rollup} (period, start, station_id, visits, visitors)
+    SELECT %s, date_trunc(%s, visit.timestamp), link.station_id,
+           count(*), count(DISTINCT visit.user_id)
+    FROM {visits} AS visit
+    JOIN {links} AS link ON link.beacon_id = visit.beacon_id
+    WHERE visit.timestamp >= %s
+    GROUP BY 2, 3
+"""
+
+
+def _start_of_day(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_rollup_start(rebuild=False):
+    """Get the time from which the rollups have to be rebuilt
+
+    The last LOOKBACK hours already rolled up are rebuilt as well, so the
+    visits inserted late by the write-behind buffer or an offline app are
+    counted. The time is moved back to midnight so that whole days are
+    rebuilt.
+
+    Returns:
+        :obj: `datetime`: None if there is no visit to roll up
+
+    """
+    last = None
+    if not rebuild:
+        last = BeaconVisitRollup.objects.filter(
+            period=VisitRollup.HOUR
+        ).aggregate(Max('start'))['start__max']
+
+    if last is None:
+        last = UserVisitedBeacons.objects.aggregate(Min('timestamp'))['timestamp__min']
+        if last is None:
+            return None
+    else:
+        last -= timedelta(hours=settings.VISIT_ROLLUP_LOOKBACK_HOURS)
+
+    return _start_of_day(timezone.localtime(last, timezone.utc))
+
+
+def rollup_visits(rebuild=False):
+    """Rebuild the hourly and daily rollups from the raw visits
+
+    The rollups from the start time on are deleted and aggregated again
+    with one INSERT ... SELECT per table and period, in one transaction,
+    so the dashboard never sees a half-built period.
+
+    Returns:
+        :obj: `datetime`: the start time, None if there was nothing to do
+
+    """
+    since = get_rollup_start(rebuild)
+    if since is None:
+        return None
+
+    tables = {
+        'visits': UserVisitedBeacons._meta.db_table,
+        'links': Beacon.station.through._meta.db_table,
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, sql in ((BeaconVisitRollup, BEACON_ROLLUP_SQL),
+                           (StationVisitRollup, STATION_ROLLUP_SQL)):
+            model.objects.filter(start__gte=since).delete()
+            for period, label in VisitRollup.PERIODS:
+                cursor.execute(
+                    sql.format(rollup=model._meta.db_table, **tables),
+                    [period, period, since]
+                )
+
+    return since
+
+
+def get_visit_timeline(period, since):
+    """Visits of all beacons per period from `since` on
+
+    Returns:
+        list of dict: 'start' and 'visits' of each period
+
+    """
+    return list(BeaconVisitRollup.objects.filter(
+        period=period,
+        start__gte=since
+    ).values('start').annotate(
+        visits=Sum('visits')
+    ).order_by('start'))
+
+
+def get_top_stations(since, limit=20):
+    """Stations with the most visits in the daily rollups from `since` on
+
+    Returns:
+        list of dict: 'station_id', 'station__name', 'visits' and
+            'visitors', the latter adding up the distinct users of each day
+
+    """
+    return list(StationVisitRollup.objects.filter(
+        period=VisitRollup.DAY,
+        start__gte=since
+    ).values('station_id', 'station__name').annotate(
+        visits=Sum('visits'),
+        visitors=Sum('visitors')
+    ).order_by('-visits')[:limit])
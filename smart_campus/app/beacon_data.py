@@ -0,0 +1,146 @@
+from django.contrib.gis.geos import Point
+from django.db import transaction
+
+from .models import Beacon, UserGroup
+from .readers import cell_text
+from .routing import routing_table
+from .utils import bulk_update
+
+
+# Columns of the beacon sheet
+BEACON_ID_COLUMN = 'Beacon ID'
+NAME_COLUMN = 'idname'
+DESCRIPTION_COLUMN = 'description'
+LATITUDE_COLUMN = 'Latitude'
+LONGITUDE_COLUMN = 'Longitude'
+OWNER_GROUP_COLUMN = 'OwnerGroup'
+
+BEACON_COLUMNS = (
+    BEACON_ID_COLUMN, NAME_COLUMN, DESCRIPTION_COLUMN,
+    LATITUDE_COLUMN, LONGITUDE_COLUMN, OWNER_GROUP_COLUMN
+)
+
+# Fields written by the import, compared to find the changed beacons
+BEACON_FIELDS = ('name', 'description', 'location', 'owner_group')
+
+IMPORT_CHUNK_SIZE = 1000
+
+
+def build_beacon(row, group_ids):
+    """Build an unsaved beacon from a row of the sheet
+
+    Args:
+        row (dict): cells keyed by column name
+        group_ids (dict): ids of the user groups keyed by name
+
+    Returns:
+        :obj: `Beacon`
+
+    Raises:
+        ValueError: if the beacon id, the name or the coordinates are invalid
+
+    """
+    beacon_id = cell_text(row.get(BEACON_ID_COLUMN))
+    name = cell_text(row.get(NAME_COLUMN))
+    if not beacon_id or not name:
+        raise ValueError('{0} and {1} are required'.format(BEACON_ID_COLUMN, NAME_COLUMN))
+
+    try:
+        location = Point(
+            x=float(row.get(LONGITUDE_COLUMN)),
+            y=float(row.get(LATITUDE_COLUMN)),
+            srid=4326
+        )
+    except (TypeError, ValueError):
+        raise ValueError('Invalid coordinates of beacon {0}'.format(beacon_id))
+
+    return Beacon(
+        beacon_id=beacon_id,
+        name=name,
+        description=cell_text(row.get(DESCRIPTION_COLUMN)),
+        location=location,
+        owner_group_id=group_ids.get(cell_text(row.get(OWNER_GROUP_COLUMN)))
+    )
+
+
+def _has_changed(existing, beacon):
+    return (
+        existing.name != beacon.name or
+        existing.description != beacon.description or
+        existing.owner_group_id != beacon.owner_group_id or
+        existing.location.coords != beacon.location.coords
+    )
+
+
+def import_beacons(chunks, dry_run=False, progress=None):
+    """Create or update the beacons of a sheet
+
+    Each chunk is diffed against the existing beacons fetched with one
+    query, then written with one bulk INSERT and one bulk UPDATE. All
+    chunks are written in a single transaction, which is rolled back on
+    error or if `dry_run` is set. When a beacon id appears more than once,
+    the last row wins.
+
+    Args:
+        chunks (iterable): lists of rows, each a dict of cells keyed by column
+        dry_run (bool): report the changes without keeping them
+        progress (callable): called with the counts after each chunk
+
+    Returns:
+        dict: numbers of 'rows', 'created', 'updated' and 'unchanged' beacons,
+            and the set of 'unknown_groups' names which were left empty
+
+    Raises:
+        ValueError: if a row is invalid, nothing is written then
+
+    """
+    group_ids = dict(UserGroup.objects.values_list('name', 'id'))
+    counts = {
+        'rows': 0,
+        'created': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'unknown_groups': set(),
+    }
+
+    with transaction.atomic():
+        for rows in chunks:
+            beacons = {}
+            for row in rows:
+                counts['rows'] += 1
+                try:
+                    beacon = build_beacon(row, group_ids)
+                except ValueError as e:
+                    raise ValueError('Row {0}: {1}'.format(counts['rows'], e))
+                group_name = cell_text(row.get(OWNER_GROUP_COLUMN))
+                if group_name and beacon.owner_group_id is None:
+                    counts['unknown_groups'].add(group_name)
+                beacons[beacon.beacon_id] = beacon
+
+            existing = Beacon.objects.in_bulk(list(beacons))
+            created = []
+            updated = []
+            for beacon_id, beacon in beacons.items():
+                if beacon_id not in existing:
+                    created.append(beacon)
+                elif _has_changed(existing[beacon_id], beacon):
+                    updated.append(beacon)
+                else:
+                    counts['unchanged'] += 1
+
+            Beacon.objects.bulk_create(created)
+            bulk_update(Beacon, updated, BEACON_FIELDS)
+            counts['created'] += len(created)
+            counts['updated'] += len(updated)
+
+            if progress:
+                progress(counts)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run and (counts['created'] or counts['updated']):
+        # Bulk writes send no signal, so the routing tables are not dropped
+        routing_table.invalidate()
+
+    return counts
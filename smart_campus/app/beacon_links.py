@@ -0,0 +1,141 @@
+from django.db import connection, transaction
+from django.db.models import Q
+
+import hashlib
+
+from .models import Beacon, Station
+from .routing import routing_table
+
+
+BeaconStation = Beacon.station.through
+
+
+def find_nearest_stations(radius, count):
+    """Find the `count` stations nearest to each beacon within `radius`
+
+    A lateral join walks the GiST index of the stations once per beacon
+    with the `<->` operator, then the candidates farther than the radius
+    on the sphere are dropped.
+
+    Args:
+        radius (float): maximum distance in meters
+        count (int): maximum number of stations per beacon
+
+    Returns:
+        dict: ids of the stations, nearest first, keyed by beacon id;
+            beacons without any station in range are left out
+
+    """
+    distance_function = connection.ops.spatial_function_name('DistanceSphere')
+    sql = """
+        SELECT beacon.beacon_id, nearest.id
+        FROM app_beacon AS beacon
+        CROSS JOIN LATERAL (
+            SELECT station.id, station.location
+            FROM app_station AS station
+            WHERE station.location IS NOT NULL
+            ORDER BY station.location <-> beacon.location
+            LIMIT %s
+        ) AS nearest
+        WHERE {0}(beacon.location, nearest.location) <= %s
+        ORDER BY beacon.beacon_id, {0}(beacon.location, nearest.location)
+    """.format(distance_function)
+
+    nearest = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [count, radius])
+        for beacon_id, station_id in cursor.fetchall():
+            nearest.setdefault(beacon_id, []).append(station_id)
+    return nearest
+
+
+def plan_beacon_links(radius, count):
+    """Compare the computed links with the current ones
+
+    Beacons without any station in range keep their links.
+
+    Returns:
+        list of dict: one entry per beacon whose links change, formatting with::
+            {
+                'beacon_id': beacon's id,
+                'beacon_name': beacon's name,
+                'added': list of (station id, station name),
+                'removed': list of (station id, station name)
+            }
+
+    """
+    nearest = find_nearest_stations(radius, count)
+
+    current = {}
+    for beacon_id, station_id in BeaconStation.objects.filter(
+            beacon_id__in=list(nearest)).values_list('beacon_id', 'station_id'):
+        current.setdefault(beacon_id, set()).add(station_id)
+
+    changes = []
+    for beacon_id in sorted(nearest):
+        linked = current.get(beacon_id, set())
+        added = [pk for pk in nearest[beacon_id] if pk not in linked]
+        removed = sorted(linked - set(nearest[beacon_id]))
+        if added or removed:
+            changes.append({
+                'beacon_id': beacon_id,
+                'added': added,
+                'removed': removed,
+            })
+
+    beacon_names = dict(Beacon.objects.filter(
+        beacon_id__in=[change['beacon_id'] for change in changes]
+    ).values_list('beacon_id', 'name'))
+    station_names = dict(Station.objects.filter(
+        pk__in={pk for change in changes for pk in change['added'] + change['removed']}
+    ).values_list('id', 'name'))
+    for change in changes:
+        change['beacon_name'] = beacon_names.get(change['beacon_id'], '')
+        for key in ('added', 'removed'):
+            change[key] = [(pk, station_names.get(pk, '')) for pk in change[key]]
+
+    return changes
+
+
+def fingerprint(changes):
+    """Digest of a plan, to check that the applied plan is the reviewed one"""
+    raw = ';'.join(
+        '{0}+{1}-{2}'.format(
+            change['beacon_id'],
+            ','.join(str(pk) for pk, name in change['added']),
+            ','.join(str(pk) for pk, name in change['removed'])
+        )
+        for change in changes
+    )
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def apply_beacon_links(changes):
+    """Apply a plan made by `plan_beacon_links` in one transaction
+
+    The through table is written directly, with one DELETE and one bulk
+    INSERT, so no `m2m_changed` signal is sent and the routing table is
+    invalidated here, once the outermost transaction commits: other
+    processes reloading the table earlier would keep the old links under
+    the new counter.
+
+    """
+    removed = Q()
+    for change in changes:
+        if change['removed']:
+            removed |= Q(
+                beacon_id=change['beacon_id'],
+                station_id__in=[pk for pk, name in change['removed']]
+            )
+
+    with transaction.atomic():
+        if removed:
+            BeaconStation.objects.filter(removed).delete()
+        BeaconStation.objects.bulk_create([
+            BeaconStation(beacon_id=change['beacon_id'], station_id=pk)
+            for change in changes
+            for pk, name in change['added']
+        ])
+
+    if changes:
+        transaction.on_commit(routing_table.invalidate)
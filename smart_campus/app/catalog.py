@@ -0,0 +1,209 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from datetime import datetime
+import hashlib
+import json
+import time
+
+from .models import Station
+
+
+STATION_CATALOG_KEY = 'catalog:stations'
+
+# Models whose changes are visible in each of the mobile read APIs
+STATION_CATALOG_MODELS = (
+    'app.station', 'app.stationimage', 'app.stationcategory', 'app.reward'
+)
+REWARD_CATALOG_MODELS = ('app.reward',)
+TRAVEL_PLAN_CATALOG_MODELS = ('app.travelplan', 'app.station')
+
+
+def _version_key(model_label):
+    return 'catalog:version:{0}'.format(model_label)
+
+
+def _now():
+    return int(time.time() * 1000000)
+
+
+def get_versions(model_labels):
+    """Get the change counters of the given models in one cache round trip
+
+    A counter is the time of the last change in microseconds, so it also
+    serves as the modification time of the model. A counter evicted from
+    the cache restarts at the current time, which is never smaller than
+    the number it replaces.
+
+    Args:
+        model_labels (tuple of str): lowercase model labels, e.g. 'app.station'
+
+    Returns:
+        tuple of int: change counters in the order of `model_labels`
+
+    """
+    keys = [_version_key(label) for label in model_labels]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _now(), None)
+            versions[key] = cache.get(key)
+
+    return tuple(versions[key] for key in keys)
+
+
+def _bump(key):
+    cache.add(key, _now(), None)
+    current = cache.get(key, 0)
+    try:
+        # Step forward to the current time, at least by one
+        cache.incr(key, max(_now() - current, 1))
+    except ValueError:
+        # Evicted between the add and the incr
+        cache.add(key, _now(), None)
+
+
+def bump_version(model_label):
+    """Mark the model as changed once the current transaction commits
+
+    Bumping before the commit would let another process build a snapshot
+    from the old rows and store it under the new counter. In autocommit
+    mode the counter is bumped at once.
+
+    The counter is only moved forward with `incr`, which is atomic on the
+    memcached of production, so concurrent bumps never hand out the same
+    counter twice nor move it backwards. The local-memory cache of the
+    development settings is per process anyway.
+
+    """
+    key = _version_key(model_label)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def get_request_versions(request, model_labels):
+    """Memoize the counters on the request so that the ETag, the
+    Last-Modified header and the view body share one cache lookup"""
+    memo = request.__dict__.setdefault('_catalog_versions', {})
+    if model_labels not in memo:
+        memo[model_labels] = get_versions(model_labels)
+    return memo[model_labels]
+
+
+def get_url_prefix(request):
+    if settings.API_URL_PREFIX:
+        return settings.API_URL_PREFIX
+    return '{0}{1}'.format(
+        'https://' if request.is_secure() else 'http://',
+        request.get_host()
+    )
+
+
+def catalog_etag(model_labels):
+    """Build an `etag_func` for `django.views.decorators.http.condition`
+
+    The payloads contain absolute urls, so the url prefix is part of the tag.
+
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = get_request_versions(request, model_labels)
+        raw = '{0}|{1}'.format(
+            get_url_prefix(request),
+            ','.join(str(version) for version in versions)
+        )
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return etag_func
+
+
+def catalog_last_modified(model_labels):
+    """Build a `last_modified_func` for `django.views.decorators.http.condition`"""
+    def last_modified_func(request, *args, **kwargs):
+        versions = get_request_versions(request, model_labels)
+        return datetime.fromtimestamp(max(versions) / 1000000, tz=timezone.utc)
+    return last_modified_func
+
+
+def serialize_station(station, url_prefix):
+    """Serialize a station whose rewards are prefetched
+
+    Args:
+        station (:obj: `Station`): station with `reward_set` prefetched
+        url_prefix (str): scheme and host prepended to the image urls
+
+    Returns:
+        dict: the station in the format of `get_all_stations`
+
+    """
+    primary_image = station.get_primary_image()
+
+    return {
+        'id': station.id,
+        'name': station.name,
+        'content': station.content,
+        'category': str(station.category),
+        'location': station.location.get_coords(),
+        'rewards': [reward.id for reward in station.reward_set.all()],
+        'image': {
+            'primary':
+                '{0}{1}'.format(url_prefix, primary_image)
+                if primary_image else '',
+            'others': [
+                '{0}{1}'.format(url_prefix, image_url)
+                for image_url in station.get_other_images()
+            ]
+        }
+    }
+
+
+def build_station_catalog(url_prefix):
+    """Serialize all stations into the payload of `get_all_stations`
+
+    Args:
+        url_prefix (str): scheme and host prepended to the image urls
+
+    Returns:
+        bytes: utf-8 encoded json document
+
+    """
+    stations = Station.objects.select_related(
+        'category'
+    ).prefetch_related(
+        'reward_set'
+    ).order_by('id')
+
+    data = [serialize_station(station, url_prefix) for station in stations]
+
+    return json.dumps(
+        {'data': data},
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False
+    ).encode('utf-8')
+
+
+def get_station_catalog(request):
+    """Get the pre-encoded station catalog, rebuilding it if it is outdated
+
+    The snapshot is tagged with the change counters of the models it was
+    built from. The image urls are absolute, so each url prefix has its own
+    snapshot under its own key; API_URL_PREFIX keeps a single one.
+
+    Returns:
+        bytes: utf-8 encoded json document
+
+    """
+    url_prefix = get_url_prefix(request)
+    versions = get_request_versions(request, STATION_CATALOG_MODELS)
+    key = '{0}:{1}'.format(
+        STATION_CATALOG_KEY,
+        hashlib.md5(url_prefix.encode('utf-8')).hexdigest()
+    )
+
+    snapshot_versions, content = cache.get(key, (None, None))
+    if snapshot_versions != versions:
+        content = build_station_catalog(url_prefix)
+        cache.set(key, (versions, content), None)
+
+    return content
@@ -0,0 +1,591 @@
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from collections import OrderedDict
+import csv
+import json
+
+from .catalog import bump_version
+from .models import (
+    Station, StationCategory, StationImage, UserGroup,
+    Question, Choice, TravelPlan, TravelPlanStations
+)
+from .readers import cell_text
+from .utils import bulk_update
+
+
+# Separator of the list cells of the csv files
+LIST_SEPARATOR = '|'
+
+STATION_COLUMNS = (
+    'name', 'content', 'category', 'owner_group',
+    'latitude', 'longitude', 'primary_image', 'other_images'
+)
+QUESTION_COLUMNS = ('content', 'station', 'answer')
+TRAVEL_PLAN_COLUMNS = ('name', 'description', 'stations')
+
+
+def _list(value):
+    """Read a list given as a json array or as a separated csv cell"""
+    if isinstance(value, list):
+        items = [cell_text(item) for item in value]
+    else:
+        items = cell_text(value).split(LIST_SEPARATOR)
+    return [item.strip() for item in items if item.strip()]
+
+
+def _location(row):
+    latitude = cell_text(row.get('latitude'))
+    longitude = cell_text(row.get('longitude'))
+    if not latitude and not longitude:
+        return None
+    try:
+        return Point(x=float(longitude), y=float(latitude), srid=4326)
+    except ValueError:
+        raise ValueError('Invalid coordinates')
+
+
+def _coords(point):
+    return point.coords if point is not None else None
+
+
+def _new_counts():
+    return {
+        'rows': 0,
+        'created': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'unknown': set(),
+    }
+
+
+def _read_chunk(rows, counts, parse):
+    """Parse the rows of a chunk keyed by their natural key, the last row
+    of a key wins"""
+    parsed = OrderedDict()
+    for row in rows:
+        counts['rows'] += 1
+        try:
+            key, value = parse(row)
+        except ValueError as e:
+            raise ValueError('Row {0}: {1}'.format(counts['rows'], e))
+        parsed[key] = value
+    return parsed
+
+
+def _ids_by_name(model, names):
+    return dict(model.objects.filter(
+        name__in=[name for name in names if name]
+    ).values_list('name', 'id'))
+
+
+def _parse_station(row):
+    name = cell_text(row.get('name'))
+    if not name:
+        raise ValueError('name is required')
+    return name, {
+        'content': cell_text(row.get('content')),
+        'category': cell_text(row.get('category')),
+        'owner_group': cell_text(row.get('owner_group')),
+        'location': _location(row),
+        'primary_image': cell_text(row.get('primary_image')),
+        'other_images': _list(row.get('other_images')),
+    }
+
+
+def _import_station_images(stations, now):
+    """Add the listed images which the stations do not have yet
+
+    Args:
+        stations (list of tuple): (station, primary image path, other image
+            paths) of the stations whose images are given
+        now (:obj: `datetime`): modification time of the changed entries
+
+    """
+    current = {}
+    for image in StationImage.objects.filter(
+            station__in=[station for station, primary, others in stations]):
+        current.setdefault(image.station_id, {})[image.image.name] = image
+
+    to_create = []
+    to_update = []
+    changed_station_ids = set()
+    for station, primary, others in stations:
+        images = current.get(station.id, {})
+        for path in ([primary] if primary else []) + others:
+            if path not in images:
+                images[path] = StationImage(
+                    station_id=station.id,
+                    image=path,
+                    is_primary=path == primary
+                )
+                to_create.append(images[path])
+                changed_station_ids.add(station.id)
+        if primary:
+            # The given primary image replaces the current one
+            for path, image in images.items():
+                if image.pk and image.is_primary != (path == primary):
+                    image.is_primary = path == primary
+                    image.updated_at = now
+                    to_update.append(image)
+                    changed_station_ids.add(station.id)
+
+    StationImage.objects.bulk_create(to_create)
+    bulk_update(StationImage, to_update, ['is_primary', 'updated_at'])
+
+    # Same copies as Station.refresh_images(), with one query for all stations
+    paths = {station_id: ['', []] for station_id in changed_station_ids}
+    for station_id, image, is_primary in StationImage.objects.filter(
+            station_id__in=changed_station_ids
+    ).order_by('id').values_list('station_id', 'image', 'is_primary'):
+        if is_primary:
+            paths[station_id][0] = image
+        else:
+            paths[station_id][1].append(image)
+
+    changed_stations = []
+    for station, primary, others in stations:
+        if station.id in changed_station_ids:
+            station.primary_image_path, station.other_image_paths = paths[station.id]
+            station.updated_at = now
+            changed_stations.append(station)
+    bulk_update(
+        Station,
+        changed_stations,
+        ['primary_image_path', 'other_image_paths', 'updated_at']
+    )
+
+
+def import_stations(chunks, dry_run=False, progress=None):
+    """Create or update stations, matched by name
+
+    Categories and owner groups are looked up by name once per chunk,
+    unknown ones are left empty. Missing coordinates keep the current
+    location, new stations require them since the mobile APIs and the
+    edit page read the location of every station. Images are paths of
+    files already in the media storage, they are added to the station if
+    it does not have them yet.
+
+    Args:
+        chunks (iterable): lists of rows, each a dict with the keys of
+            `STATION_COLUMNS`
+        dry_run (bool): report the changes without keeping them
+        progress (callable): called with the counts after each chunk
+
+    Returns:
+        dict: numbers of 'rows', 'created', 'updated' and 'unchanged'
+            stations, and the set of 'unknown' names which were left empty
+
+    Raises:
+        ValueError: if a row is invalid or a new station has no
+            coordinates, nothing is written then
+
+    """
+    counts = _new_counts()
+
+    with transaction.atomic():
+        for rows in chunks:
+            parsed = _read_chunk(rows, counts, _parse_station)
+            now = timezone.now()
+            category_ids = _ids_by_name(
+                StationCategory, {data['category'] for data in parsed.values()}
+            )
+            group_ids = _ids_by_name(
+                UserGroup, {data['owner_group'] for data in parsed.values()}
+            )
+            existing = {
+                station.name: station
+                for station in Station.objects.filter(name__in=list(parsed))
+            }
+
+            created = []
+            updated = []
+            with_images = []
+            for name, data in parsed.items():
+                for field, ids in (('category', category_ids), ('owner_group', group_ids)):
+                    if data[field] and data[field] not in ids:
+                        counts['unknown'].add('{0} {1}'.format(field, data[field]))
+                values = {
+                    'content': data['content'],
+                    'category_id': category_ids.get(data['category']),
+                    'owner_group_id': group_ids.get(data['owner_group']),
+                }
+
+                station = existing.get(name)
+                if station is None:
+                    if data['location'] is None:
+                        raise ValueError(
+                            'Station {0}: coordinates are required for a new station'.format(name)
+                        )
+                    station = Station(name=name, location=data['location'], **values)
+                    created.append(station)
+                elif (any(getattr(station, field) != value for field, value in values.items()) or
+                        data['location'] is not None and
+                        _coords(station.location) != _coords(data['location'])):
+                    for field, value in values.items():
+                        setattr(station, field, value)
+                    if data['location'] is not None:
+                        station.location = data['location']
+                    station.updated_at = now
+                    updated.append(station)
+
+                if data['primary_image'] or data['other_images']:
+                    with_images.append((station, data['primary_image'], data['other_images']))
+
+            Station.objects.bulk_create(created)
+            # The backported bulk_update can not write an empty geometry
+            bulk_update(
+                Station,
+                [station for station in updated if station.location is not None],
+                ['content', 'category', 'owner_group', 'location', 'updated_at']
+            )
+            bulk_update(
+                Station,
+                [station for station in updated if station.location is None],
+                ['content', 'category', 'owner_group', 'updated_at']
+            )
+            _import_station_images(with_images, now)
+
+            counts['created'] += len(created)
+            counts['updated'] += len(updated)
+            counts['unchanged'] += len(parsed) - len(created) - len(updated)
+            if progress:
+                progress(counts)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run and counts['rows']:
+        # Bulk writes send no signal, so the caches are told here
+        bump_version('app.station')
+        bump_version('app.stationimage')
+
+    return counts
+
+
+def _parse_question(row):
+    content = cell_text(row.get('content'))
+    if not content:
+        raise ValueError('content is required')
+
+    if 'choices' in row:
+        choices = _list(row['choices'])
+    else:
+        # The csv files have one choice_<number> column per choice
+        numbers = sorted(
+            int(column.split('_', 1)[1])
+            for column in row
+            if column.startswith('choice_') and column.split('_', 1)[1].isdigit()
+        )
+        choices = [
+            cell_text(row['choice_{0}'.format(number)])
+            for number in numbers
+            if cell_text(row['choice_{0}'.format(number)])
+        ]
+    if not choices:
+        raise ValueError('a question needs choices')
+
+    # The number of the answer among the choices, as in the question form
+    try:
+        answer = int(cell_text(row.get('answer')) or 1)
+    except ValueError:
+        raise ValueError('answer should be the number of a choice')
+    if not 1 <= answer <= len(choices):
+        raise ValueError('answer should be the number of a choice')
+
+    key = (content, cell_text(row.get('station')))
+    return key, [
+        (choice, order == answer)
+        for order, choice in enumerate(choices, start=1)
+    ]
+
+
+def import_questions(chunks, dry_run=False, progress=None):
+    """Create questions with their choices, matched by content and station
+
+    The choices of an existing question are replaced when they differ.
+
+    Args:
+        chunks (iterable): lists of rows, each a dict with the keys of
+            `QUESTION_COLUMNS` and either a 'choices' list or 'choice_<number>'
+            cells, `answer` being the number of the right choice
+        dry_run (bool): report the changes without keeping them
+        progress (callable): called with the counts after each chunk
+
+    Returns:
+        dict: numbers of 'rows', 'created', 'updated' and 'unchanged' questions
+
+    Raises:
+        ValueError: if a row is invalid or names an unknown station,
+            nothing is written then
+
+    """
+    counts = _new_counts()
+
+    with transaction.atomic():
+        for rows in chunks:
+            parsed = _read_chunk(rows, counts, _parse_question)
+            station_ids = _ids_by_name(
+                Station, {station_name for content, station_name in parsed}
+            )
+            unknown = sorted(
+                station_name for content, station_name in parsed
+                if station_name and station_name not in station_ids
+            )
+            if unknown:
+                raise ValueError('Unknown stations: {0}'.format(', '.join(unknown)))
+
+            existing = {}
+            for question in Question.objects.filter(
+                    content__in=[content for content, station_name in parsed]
+            ).select_related('linked_station').order_by('-id'):
+                station_name = question.linked_station.name if question.linked_station else ''
+                # The oldest of duplicated questions is kept
+                existing[(question.content, station_name)] = question
+            current_choices = {}
+            for choice in Choice.objects.filter(
+                    question__in=list(existing.values())).order_by('id'):
+                current_choices.setdefault(choice.question_id, []).append(
+                    (choice.content, choice.is_answer)
+                )
+
+            created = []
+            replaced = []
+            for key, choices in parsed.items():
+                question = existing.get(key)
+                if question is None:
+                    content, station_name = key
+                    created.append((Question(
+                        content=content,
+                        linked_station_id=station_ids.get(station_name)
+                    ), choices))
+                elif current_choices.get(question.id, []) != choices:
+                    replaced.append((question, choices))
+
+            Question.objects.bulk_create([question for question, choices in created])
+            Choice.objects.filter(
+                question__in=[question for question, choices in replaced]
+            ).delete()
+            Choice.objects.bulk_create([
+                Choice(question=question, content=content, is_answer=is_answer)
+                for question, choices in created + replaced
+                for content, is_answer in choices
+            ])
+
+            counts['created'] += len(created)
+            counts['updated'] += len(replaced)
+            counts['unchanged'] += len(parsed) - len(created) - len(replaced)
+            if progress:
+                progress(counts)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run and (counts['created'] or counts['updated']):
+        bump_version('app.question')
+
+    return counts
+
+
+def _parse_travel_plan(row):
+    name = cell_text(row.get('name'))
+    if not name:
+        raise ValueError('name is required')
+    return name, {
+        'description': cell_text(row.get('description')),
+        # A station is visited once, as in TravelPlan.set_station_order()
+        'stations': list(OrderedDict.fromkeys(_list(row.get('stations')))),
+    }
+
+
+def import_travel_plans(chunks, dry_run=False, progress=None):
+    """Create or update travel plans, matched by name
+
+    The station sequences of each chunk are diffed against the prefetched
+    rows and written with one DELETE, one bulk UPDATE and one bulk INSERT.
+
+    Args:
+        chunks (iterable): lists of rows, each a dict with the keys of
+            `TRAVEL_PLAN_COLUMNS`, 'stations' being the station names in
+            visiting order
+        dry_run (bool): report the changes without keeping them
+        progress (callable): called with the counts after each chunk
+
+    Returns:
+        dict: numbers of 'rows', 'created', 'updated' and 'unchanged' plans
+
+    Raises:
+        ValueError: if a row is invalid or names an unknown station,
+            nothing is written then
+
+    """
+    counts = _new_counts()
+
+    with transaction.atomic():
+        for rows in chunks:
+            parsed = _read_chunk(rows, counts, _parse_travel_plan)
+            now = timezone.now()
+            station_ids = _ids_by_name(
+                Station, {name for data in parsed.values() for name in data['stations']}
+            )
+            unknown = sorted({
+                name for data in parsed.values() for name in data['stations']
+                if name not in station_ids
+            })
+            if unknown:
+                raise ValueError('Unknown stations: {0}'.format(', '.join(unknown)))
+
+            existing = {}
+            for plan in TravelPlan.objects.filter(
+                    name__in=list(parsed)
+            ).prefetch_related('travelplanstations_set').order_by('-id'):
+                # The oldest of plans with the same name is kept
+                existing[plan.name] = plan
+
+            created = []
+            updated = []
+            stations_to_create = []
+            stations_to_update = []
+            stations_to_delete = []
+            for name, data in parsed.items():
+                sequence = [station_ids[station_name] for station_name in data['stations']]
+                plan = existing.get(name)
+                if plan is None:
+                    created.append((
+                        TravelPlan(name=name, description=data['description']),
+                        sequence
+                    ))
+                    continue
+
+                to_create, to_update, to_delete = plan.diff_station_order(
+                    plan.travelplanstations_set.all(), sequence
+                )
+                if plan.description != data['description'] or to_create or to_update or to_delete:
+                    stations_to_create.extend(to_create)
+                    stations_to_update.extend(to_update)
+                    stations_to_delete.extend(to_delete)
+                    plan.description = data['description']
+                    plan.updated_at = now
+                    updated.append(plan)
+
+            TravelPlan.objects.bulk_create([plan for plan, sequence in created])
+            for plan, sequence in created:
+                stations_to_create.extend(plan.diff_station_order([], sequence)[0])
+
+            if stations_to_delete:
+                TravelPlanStations.objects.filter(
+                    pk__in=[travelplanstation.pk for travelplanstation in stations_to_delete]
+                ).delete()
+            bulk_update(TravelPlanStations, stations_to_update, ['order'])
+            TravelPlanStations.objects.bulk_create(stations_to_create)
+            bulk_update(TravelPlan, updated, ['description', 'updated_at'])
+
+            counts['created'] += len(created)
+            counts['updated'] += len(updated)
+            counts['unchanged'] += len(parsed) - len(created) - len(updated)
+            if progress:
+                progress(counts)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run and (counts['created'] or counts['updated']):
+        bump_version('app.travelplan')
+
+    return counts
+
+
+def export_stations():
+    """Yield the stations in the format read by `import_stations`"""
+    stations = Station.objects.select_related(
+        'category', 'owner_group'
+    ).order_by('id')
+
+    for station in stations.iterator():
+        yield OrderedDict((
+            ('name', station.name),
+            ('content', station.content),
+            ('category', station.category.name if station.category else ''),
+            ('owner_group', station.owner_group.name if station.owner_group else ''),
+            ('latitude', station.location.y if station.location else ''),
+            ('longitude', station.location.x if station.location else ''),
+            ('primary_image', station.primary_image_path),
+            ('other_images', list(station.other_image_paths)),
+        ))
+
+
+def export_questions():
+    """Yield the questions in the format read by `import_questions`"""
+    questions = Question.objects.select_related(
+        'linked_station'
+    ).prefetch_related('choice_set').order_by('id')
+
+    for question in questions:
+        choices = sorted(question.choice_set.all(), key=lambda choice: choice.id)
+        yield OrderedDict((
+            ('content', question.content),
+            ('station', question.linked_station.name if question.linked_station else ''),
+            ('choices', [choice.content for choice in choices]),
+            ('answer', next(
+                (order for order, choice in enumerate(choices, start=1) if choice.is_answer),
+                ''
+            )),
+        ))
+
+
+def export_travel_plans():
+    """Yield the travel plans in the format read by `import_travel_plans`"""
+    plans = TravelPlan.objects.prefetch_related(
+        'travelplanstations_set__station'
+    ).order_by('id')
+
+    for plan in plans:
+        yield OrderedDict((
+            ('name', plan.name),
+            ('description', plan.description),
+            ('stations', [
+                travelplanstation.station.name
+                for travelplanstation in plan.travelplanstations_set.all()
+            ]),
+        ))
+
+
+def max_choice_count():
+    """Number of choice_<number> columns needed to export the questions"""
+    return Question.objects.annotate(
+        choice_count=Count('choice')
+    ).aggregate(Max('choice_count'))['choice_count__max'] or 0
+
+
+def write_jsonl(records, output):
+    count = 0
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(records, output, columns):
+    """Write the records as csv, joining the lists with `LIST_SEPARATOR`
+
+    A 'choices' list is spread over the choice_<number> columns.
+
+    """
+    writer = csv.DictWriter(output, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        row = {}
+        for key, value in record.items():
+            if key == 'choices':
+                for number, choice in enumerate(value, start=1):
+                    row['choice_{0}'.format(number)] = choice
+            elif isinstance(value, list):
+                row[key] = LIST_SEPARATOR.join(value)
+            else:
+                row[key] = value
+        writer.writerow(row)
+        count += 1
+    return count
@@ -0,0 +1,50 @@
+from django.utils.functional import SimpleLazyObject
+
+import threading
+
+from .catalog import get_versions
+from .models import StationCategory
+
+
+class CategoryNavigation(object):
+    """Per-process list of the station categories shown in the sidebar
+
+    The list is loaded with one query on first use and reloaded once the
+    change counter of StationCategory, bumped whenever a category is saved
+    or deleted, no longer matches the one it was loaded with.
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.categories = None
+        self.version = None
+
+    def invalidate(self):
+        with self.lock:
+            self.categories = None
+
+    def get(self):
+        version, = get_versions((StationCategory._meta.label_lower,))
+
+        with self.lock:
+            if self.categories is not None and self.version == version:
+                return self.categories
+
+        categories = list(StationCategory.objects.order_by('id'))
+
+        with self.lock:
+            self.categories = categories
+            self.version = version
+        return categories
+
+
+category_navigation = CategoryNavigation()
+
+
+def categories(request):
+    """Provide the station categories to every template
+
+    Evaluated lazily, so pages which do not render the sidebar pay nothing.
+
+    """
+    return {'categories': SimpleLazyObject(category_navigation.get)}
@@ -33,7 +33,7 @@ class PartialStationForm(ModelForm):
 
     class Meta:
         model = Station
-        exclude = ['location']
+        exclude = ['location', 'primary_image_path', 'other_image_paths']
 
 
 class StationCategoryForm(ModelForm):
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.beacon_links import plan_beacon_links, apply_beacon_links
+
+
+class Command(BaseCommand):
+    help = 'Link every beacon to its nearest stations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--radius',
+            type=float,
+            default=settings.BEACON_AUTO_LINK_RADIUS,
+            help='Maximum distance in meters between a beacon and its stations'
+        )
+        parser.add_argument(
+            '--stations',
+            type=int,
+            default=settings.BEACON_AUTO_LINK_STATIONS,
+            help='Maximum number of stations linked to a beacon'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the changes without saving them'
+        )
+
+    def handle(self, *args, **options):
+        if options['radius'] <= 0 or options['stations'] < 1:
+            raise CommandError('--radius and --stations should be positive')
+
+        # Planned and applied in one transaction, like the auto-link page
+        with transaction.atomic():
+            changes = plan_beacon_links(options['radius'], options['stations'])
+
+            for change in changes:
+                self.stdout.write('{0} ({1})'.format(change['beacon_name'], change['beacon_id']))
+                for pk, name in change['added']:
+                    self.stdout.write(self.style.SUCCESS('  + {0} ({1})'.format(name, pk)))
+                for pk, name in change['removed']:
+                    self.stdout.write(self.style.WARNING('  - {0} ({1})'.format(name, pk)))
+
+            if options['dry_run']:
+                self.stdout.write(self.style.SUCCESS(
+                    'Dry run, {0} beacons would change.'.format(len(changes))
+                ))
+                return
+
+            apply_beacon_links(changes)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Relinked {0} beacons.'.format(len(changes))
+        ))
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+import time
+
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare the latency of a management page under each session backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the manager to log in as')
+        parser.add_argument(
+            '--path',
+            default='/stations/',
+            help='Page to request, /stations/ by default'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of timed requests per backend'
+        )
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            choices=sorted(settings.SESSION_ENGINES),
+            default=sorted(settings.SESSION_ENGINES),
+            help='Backends to compare, all of them by default'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if not user:
+            raise CommandError('No user with email {0}'.format(options['email']))
+        if options['requests'] < 1:
+            raise CommandError('--requests should be positive')
+
+        self.stdout.write('{0:<16}{1:>10}{2:>10}{3:>10}{4:>10}'.format(
+            'backend', 'mean ms', 'p50 ms', 'p95 ms', 'queries'
+        ))
+        for backend in options['backends']:
+            latencies, queries = self.benchmark(
+                user, backend, options['path'], options['requests']
+            )
+            latencies.sort()
+            self.stdout.write('{0:<16}{1:>10.2f}{2:>10.2f}{3:>10.2f}{4:>10.1f}'.format(
+                backend,
+                sum(latencies) / len(latencies),
+                latencies[len(latencies) // 2],
+                latencies[int(len(latencies) * 0.95)],
+                queries / len(latencies)
+            ))
+
+    def benchmark(self, user, backend, path, requests):
+        """Time `requests` requests to `path` with a logged in session
+
+        Returns:
+            tuple: (list of latencies in milliseconds, number of queries)
+
+        """
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[backend]):
+            # A new client builds its middleware with the overridden engine
+            client = Client()
+            client.force_login(user)
+
+            # Warm up the caches, it is not the cost of a session lookup
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError('{0} responded {1} with the {2} backend'.format(
+                    path, response.status_code, backend
+                ))
+
+            latencies = []
+            with CaptureQueriesContext(connection) as context:
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    client.get(path)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            client.logout()
+
+        return latencies, len(context.captured_queries)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.query_plans import explain_hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Show the query plans of the hot lookups and flag the sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--disable-seqscan',
+            action='store_true',
+            help='Make the planner avoid sequential scans, as on large tables'
+        )
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Exit with an error if any query uses a sequential scan'
+        )
+
+    def handle(self, *args, **options):
+        reports = explain_hot_queries(disable_seqscan=options['disable_seqscan'])
+
+        flagged = []
+        for report in reports:
+            if report['seq_scans']:
+                flagged.append(report['label'])
+                self.stdout.write(self.style.WARNING('{0}: Seq Scan on {1}'.format(
+                    report['label'], ', '.join(report['seq_scans'])
+                )))
+            else:
+                self.stdout.write(self.style.SUCCESS('{0}: index'.format(report['label'])))
+            if options['verbosity'] > 1:
+                for line in report['plan']:
+                    self.stdout.write('    ' + line)
+
+        if flagged and options['fail']:
+            raise CommandError('Sequential scans in: {0}'.format(', '.join(flagged)))
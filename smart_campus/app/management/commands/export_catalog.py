@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import os
+
+from app.catalog_data import (
+    export_stations, export_questions, export_travel_plans, max_choice_count,
+    write_jsonl, write_csv,
+    STATION_COLUMNS, QUESTION_COLUMNS, TRAVEL_PLAN_COLUMNS
+)
+
+
+EXPORTERS = {
+    'stations': (export_stations, STATION_COLUMNS),
+    'questions': (export_questions, QUESTION_COLUMNS),
+    'travel_plans': (export_travel_plans, TRAVEL_PLAN_COLUMNS),
+}
+
+
+class Command(BaseCommand):
+    help = 'Write stations, questions or travel plans to a jsonl or csv file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTERS))
+        parser.add_argument('path', help='.jsonl or .csv file, in the format read by import_catalog')
+
+    def handle(self, *args, **options):
+        export, columns = EXPORTERS[options['kind']]
+        extension = os.path.splitext(options['path'])[1].lower()
+        if extension not in ('.jsonl', '.csv'):
+            raise CommandError('The file should end with .jsonl or .csv')
+
+        if options['kind'] == 'questions':
+            columns = columns + tuple(
+                'choice_{0}'.format(number)
+                for number in range(1, max_choice_count() + 1)
+            )
+
+        with open(options['path'], 'w', newline='', encoding='utf-8') as output:
+            if extension == '.jsonl':
+                count = write_jsonl(export(), output)
+            else:
+                count = write_csv(export(), output, columns)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Exported {0} {1}.'.format(count, options['kind'])
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.visits import drain_spool
+
+
+class Command(BaseCommand):
+    help = 'Insert the beacon visits left in the write-behind spool directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir',
+            help='Directory of the spool files, VISIT_SPOOL_DIR by default'
+        )
+
+    def handle(self, *args, **options):
+        count = drain_spool(options['spool_dir'])
+        self.stdout.write(self.style.SUCCESS(
+            'Flushed {0} buffered visits.'.format(count)
+        ))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.beacon_data import IMPORT_CHUNK_SIZE
+from app.catalog_data import import_stations, import_questions, import_travel_plans
+from app.readers import read_chunks
+
+
+IMPORTERS = {
+    'stations': import_stations,
+    'questions': import_questions,
+    'travel_plans': import_travel_plans,
+}
+
+
+class Command(BaseCommand):
+    help = 'Create or update stations, questions or travel plans from a jsonl or csv file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='.jsonl, .csv, .xlsx or .xls file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the changes without saving them'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Number of rows read and written at a time'
+        )
+
+    def progress(self, counts):
+        self.stdout.write('Processed {0} rows'.format(counts['rows']))
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size should be positive')
+
+        try:
+            counts = IMPORTERS[options['kind']](
+                read_chunks(options['path'], options['chunk_size']),
+                dry_run=options['dry_run'],
+                progress=self.progress
+            )
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(e)
+
+        for name in sorted(counts['unknown']):
+            self.stdout.write(self.style.WARNING('Unknown {0}, left empty.'.format(name)))
+
+        summary = '{0} rows: {1} created, {2} updated, {3} unchanged.'.format(
+            counts['rows'], counts['created'], counts['updated'], counts['unchanged']
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Dry run, nothing saved. ' + summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Import of {0} succeeded. {1}'.format(options['kind'], summary)
+            ))
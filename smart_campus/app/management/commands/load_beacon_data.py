@@ -1,31 +1,51 @@
 from django.core.management.base import BaseCommand, CommandError
-from django.contrib.gis.geos import Point
 
-import pandas as pd
-
-from app.models import Beacon, UserGroup
+from app.beacon_data import import_beacons, IMPORT_CHUNK_SIZE
+from app.readers import read_chunks
 
 
 class Command(BaseCommand):
-    help = 'Insert beacon data from xls file'
+    help = 'Insert beacon data from a csv, xlsx or xls file'
 
     def add_arguments(self, parser):
         parser.add_argument('path', nargs=1, type=str)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the changes without saving them'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Number of rows read and written at a time'
+        )
+
+    def progress(self, counts):
+        self.stdout.write('Processed {0} rows'.format(counts['rows']))
 
     def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size should be positive')
+
         try:
-            data = pd.read_excel(options['path'][0])
-            for index, datum in data.iterrows():
-                Beacon.objects.update_or_create(
-                    beacon_id=datum['Beacon ID'],
-                    defaults={
-                        'name': datum['idname'],
-                        'description': datum['description'],
-                        'location': Point(y=float(datum['Latitude']), x=float(datum['Longitude'])),
-                        'owner_group': UserGroup.objects.filter(name=datum['OwnerGroup']).first()
-                    }
-                )
-        except FileNotFoundError as e:
+            counts = import_beacons(
+                read_chunks(options['path'][0], options['chunk_size']),
+                dry_run=options['dry_run'],
+                progress=self.progress
+            )
+        except (FileNotFoundError, ValueError) as e:
             raise CommandError(e)
 
-        self.stdout.write(self.style.SUCCESS('Update beacon data succeeded.'))
+        for group_name in sorted(counts['unknown_groups']):
+            self.stdout.write(self.style.WARNING(
+                'Unknown owner group {0}, left empty.'.format(group_name)
+            ))
+
+        summary = '{0} rows: {1} created, {2} updated, {3} unchanged.'.format(
+            counts['rows'], counts['created'], counts['updated'], counts['unchanged']
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Dry run, nothing saved. ' + summary))
+        else:
+            self.stdout.write(self.style.SUCCESS('Update beacon data succeeded. ' + summary))
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+import gzip
+import os
+
+from app.partitions import (
+    add_months, month_of, partition_name, is_partitioned, list_partitions,
+    create_partition, detach_partition, archive_partition
+)
+
+
+class Command(BaseCommand):
+    help = 'Create the coming monthly partitions of the visit log and retire the old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.VISIT_PARTITION_PREMAKE_MONTHS,
+            help='Months of partitions to create after the current one'
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.VISIT_RETENTION_MONTHS,
+            help='Months of visits to keep, older partitions are detached'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='Write the detached partitions there as csv.gz, then drop them'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the changes without applying them'
+        )
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0 or options['retention_months'] < 1:
+            raise CommandError('--months-ahead must be >= 0 and --retention-months >= 1')
+        if not is_partitioned():
+            raise CommandError(
+                'The visit log is not partitioned, it requires PostgreSQL 11 or later'
+            )
+
+        archive_dir = options['archive_dir']
+        if archive_dir and not os.path.isdir(archive_dir):
+            raise CommandError('{0} is not a directory'.format(archive_dir))
+
+        dry_run = options['dry_run']
+        current = month_of(timezone.now())
+        existing = list_partitions()
+
+        for count in range(options['months_ahead'] + 1):
+            month = add_months(current, count)
+            if month in existing:
+                continue
+            self.stdout.write('Create {0}'.format(partition_name(month)))
+            if not dry_run:
+                create_partition(month)
+
+        oldest = add_months(current, 1 - options['retention_months'])
+        for month in existing:
+            if month >= oldest:
+                break
+            name = partition_name(month)
+            if dry_run:
+                self.stdout.write('Detach {0}'.format(name))
+                continue
+
+            with transaction.atomic():
+                detach_partition(month)
+                if archive_dir:
+                    path = os.path.join(archive_dir, name + '.csv.gz')
+                    with gzip.open(path, 'wb') as output:
+                        archive_partition(month, output)
+            if archive_dir:
+                self.stdout.write('Archived {0} to {1}'.format(name, path))
+            else:
+                self.stdout.write('Detached {0}'.format(name))
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from datetime import timedelta
+
+from app.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than the sync retention period'
+
+    def handle(self, *args, **options):
+        expired_before = timezone.now() - timedelta(
+            days=settings.SYNC_TOMBSTONE_RETENTION_DAYS
+        )
+        count, _ = Tombstone.objects.filter(deleted_at__lt=expired_before).delete()
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted {0} expired tombstones.'.format(count)
+        ))
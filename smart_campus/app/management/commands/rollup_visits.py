@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.analytics import rollup_visits
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the beacon visits into the hourly and daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild the rollups from the first visit on'
+        )
+
+    def handle(self, *args, **options):
+        since = rollup_visits(rebuild=options['rebuild'])
+        if since is None:
+            self.stdout.write(self.style.SUCCESS('No visit to roll up.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Rolled up the visits since {0}.'.format(since.isoformat())
+            ))
@@ -0,0 +1,35 @@
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from .models import User
+from .tokens import api_token
+
+
+class APITokenMiddleware(object):
+    """Authenticate mobile app requests by their `Authorization` header
+
+    Requests sending `Authorization: Token <token>` get the email of the
+    user in `request.api_user_email` and the user, fetched on first access,
+    in `request.api_user`. No session is read or written.
+
+    """
+    keyword = 'Token '
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.api_user_email = None
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+
+        if header.startswith(self.keyword):
+            request.api_user_email = api_token.check_token(
+                header[len(self.keyword):].strip()
+            )
+            if request.api_user_email is None:
+                return HttpResponse('Invalid or expired token', status=401)
+
+        request.api_user = SimpleLazyObject(
+            lambda: User.objects.filter(email=request.api_user_email).first()
+        )
+        return self.get_response(request)
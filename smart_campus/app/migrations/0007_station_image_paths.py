@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+def copy_image_paths(apps, schema_editor):
+    Station = apps.get_model('app', 'Station')
+    StationImage = apps.get_model('app', 'StationImage')
+
+    images = {}
+    for station_id, image, is_primary in StationImage.objects.order_by(
+        'id'
+    ).values_list('station_id', 'image', 'is_primary'):
+        images.setdefault(station_id, []).append((image, is_primary))
+
+    for station in Station.objects.filter(pk__in=images.keys()):
+        station_images = images[station.pk]
+        station.primary_image_path = next(
+            (image for image, is_primary in station_images if is_primary),
+            ''
+        )
+        station.other_image_paths = [
+            image for image, is_primary in station_images if not is_primary
+        ]
+        station.save(update_fields=['primary_image_path', 'other_image_paths'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_uservisitedbeacons_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='primary_image_path',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='other_image_paths',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, size=None),
+        ),
+        migrations.RunPython(copy_image_paths, migrations.RunPython.noop),
+    ]
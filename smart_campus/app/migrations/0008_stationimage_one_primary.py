@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def demote_extra_primary_images(apps, schema_editor):
+    """Keep the oldest primary image of stations having several
+
+    0007 already copied the image paths into the stations, so those of the
+    demoted images are moved to the other images there as well.
+
+    """
+    Station = apps.get_model('app', 'Station')
+    StationImage = apps.get_model('app', 'StationImage')
+
+    kept = dict(StationImage.objects.filter(
+        is_primary=True
+    ).values('station_id').annotate(
+        count=Count('id'),
+        first=Min('id')
+    ).filter(count__gt=1).values_list('station_id', 'first'))
+    if not kept:
+        return
+
+    StationImage.objects.filter(
+        station_id__in=kept, is_primary=True
+    ).exclude(id__in=kept.values()).update(is_primary=False)
+
+    for station in Station.objects.filter(pk__in=kept):
+        images = StationImage.objects.filter(
+            station_id=station.pk
+        ).order_by('id').values_list('image', 'is_primary')
+        station.primary_image_path = next(
+            (image for image, is_primary in images if is_primary),
+            ''
+        )
+        station.other_image_paths = [
+            image for image, is_primary in images if not is_primary
+        ]
+        station.save(update_fields=['primary_image_path', 'other_image_paths'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_station_image_paths'),
+    ]
+
+    operations = [
+        migrations.RunPython(demote_extra_primary_images, migrations.RunPython.noop),
+        # A partial unique index can not be deferred, an exclusion
+        # constraint can: the primary image may then be moved with a single
+        # UPDATE. Its partial index also serves primary image lookups.
+        migrations.RunSQL(
+            """
+            ALTER TABLE app_stationimage
+            ADD CONSTRAINT app_stationimage_one_primary
+            EXCLUDE USING btree (station_id WITH =) WHERE (is_primary)
+            DEFERRABLE INITIALLY DEFERRED;
+            """,
+            """
+            ALTER TABLE app_stationimage
+            DROP CONSTRAINT app_stationimage_one_primary;
+            """
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_stationimage_one_primary'),
+    ]
+
+    # The names are those given by the PostGIS backend, so databases
+    # which already have the indexes are left unchanged
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE INDEX IF NOT EXISTS app_station_location_id
+            ON app_station USING GIST (location);
+            """,
+            migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX IF NOT EXISTS app_beacon_location_id
+            ON app_beacon USING GIST (location);
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_location_spatial_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uservisitedbeacons',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='BeaconVisitRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'hour'), ('day', 'day')], max_length=4)),
+                ('start', models.DateTimeField()),
+                ('visits', models.IntegerField()),
+                ('visitors', models.IntegerField()),
+                ('beacon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.Beacon')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StationVisitRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'hour'), ('day', 'day')], max_length=4)),
+                ('start', models.DateTimeField()),
+                ('visits', models.IntegerField()),
+                ('visitors', models.IntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.Station')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='beaconvisitrollup',
+            unique_together=set([('period', 'start', 'beacon')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stationvisitrollup',
+            unique_together=set([('period', 'start', 'station')]),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from datetime import date
+
+
+TABLE = 'app_uservisitedbeacons'
+
+# Months of partitions created ahead of the current one
+PREMADE_MONTHS = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _supported(connection):
+    # Indexes and foreign keys on partitioned tables came with PostgreSQL 11,
+    # older servers (e.g. 9.6 on Travis) keep the plain table
+    return connection.vendor == 'postgresql' and connection.pg_version >= 110000
+
+
+def partition_visits(apps, schema_editor):
+    connection = schema_editor.connection
+    if not _supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(timestamp) FROM {0}'.format(TABLE))
+        first, = cursor.fetchone()
+        today = date.today()
+        month = date(first.year, first.month, 1) if first else date(today.year, today.month, 1)
+        last = _add_months(date(today.year, today.month, 1), PREMADE_MONTHS)
+
+        cursor.execute("""
+            ALTER TABLE {0} RENAME TO {0}_plain;
+            CREATE TABLE {0} (LIKE {0}_plain INCLUDING DEFAULTS)
+                PARTITION BY RANGE (timestamp);
+            ALTER SEQUENCE {0}_id_seq OWNED BY {0}.id;
+            ALTER TABLE {0} ADD PRIMARY KEY (id, timestamp);
+            ALTER TABLE {0} ADD CONSTRAINT {0}_user_id_fk
+                FOREIGN KEY (user_id) REFERENCES app_user (email)
+                DEFERRABLE INITIALLY DEFERRED;
+            ALTER TABLE {0} ADD CONSTRAINT {0}_beacon_id_fk
+                FOREIGN KEY (beacon_id) REFERENCES app_beacon (beacon_id)
+                DEFERRABLE INITIALLY DEFERRED;
+            CREATE INDEX {0}_user_id ON {0} (user_id);
+            CREATE INDEX {0}_beacon_id ON {0} (beacon_id);
+            CREATE INDEX {0}_timestamp ON {0} (timestamp);
+            CREATE TABLE {0}_default PARTITION OF {0} DEFAULT;
+        """.format(TABLE))
+
+        while month <= last:
+            cursor.execute(
+                'CREATE TABLE {0}_y{1:04d}m{2:02d} PARTITION OF {0} '
+                'FOR VALUES FROM (%s) TO (%s)'.format(TABLE, month.year, month.month),
+                ['{0} 00:00:00+00'.format(month), '{0} 00:00:00+00'.format(_add_months(month, 1))]
+            )
+            month = _add_months(month, 1)
+
+        cursor.execute("""
+            INSERT INTO {0} SELECT * FROM {0}_plain;
+            DROP TABLE {0}_plain;
+        """.format(TABLE))
+
+
+def unpartition_visits(apps, schema_editor):
+    connection = schema_editor.connection
+    if not _supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+            [TABLE]
+        )
+        if cursor.fetchone() is None:
+            return
+
+        cursor.execute("""
+            ALTER TABLE {0} RENAME TO {0}_partitioned;
+            CREATE TABLE {0} (LIKE {0}_partitioned INCLUDING DEFAULTS);
+            ALTER SEQUENCE {0}_id_seq OWNED BY {0}.id;
+            INSERT INTO {0} SELECT * FROM {0}_partitioned;
+            DROP TABLE {0}_partitioned CASCADE;
+            ALTER TABLE {0} ADD PRIMARY KEY (id);
+            ALTER TABLE {0} ADD CONSTRAINT {0}_user_id_fk
+                FOREIGN KEY (user_id) REFERENCES app_user (email)
+                DEFERRABLE INITIALLY DEFERRED;
+            ALTER TABLE {0} ADD CONSTRAINT {0}_beacon_id_fk
+                FOREIGN KEY (beacon_id) REFERENCES app_beacon (beacon_id)
+                DEFERRABLE INITIALLY DEFERRED;
+            CREATE INDEX {0}_user_id ON {0} (user_id);
+            CREATE INDEX {0}_beacon_id ON {0} (beacon_id);
+            CREATE INDEX {0}_timestamp ON {0} (timestamp);
+        """.format(TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_visit_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_visits, unpartition_visits),
+    ]
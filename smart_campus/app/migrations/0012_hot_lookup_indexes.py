@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_partition_visits'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uservisitedbeacons',
+            index=models.Index(fields=['user', 'timestamp'], name='visit_user_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userreward',
+            index=models.Index(fields=['user', 'timestamp'], name='userreward_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', 'id'], name='choice_question_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationimage',
+            index=models.Index(fields=['station', 'id'], name='stationimage_station_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelplanstations',
+            index=models.Index(fields=['travelplan', 'order'], name='travelplan_station_order_idx'),
+        ),
+        # The question ids of a station, skipping the questions linked to
+        # no station. The answered ids of an user are read from the
+        # (user_id, question_id) unique index of the m2m table.
+        migrations.RunSQL(
+            """
+            CREATE INDEX IF NOT EXISTS question_linked_station_id_idx
+            ON app_question (linked_station_id, id)
+            WHERE linked_station_id IS NOT NULL;
+            """,
+            """
+            DROP INDEX IF EXISTS question_linked_station_id_idx;
+            """
+        ),
+    ]
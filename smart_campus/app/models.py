@@ -1,12 +1,17 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.auth.base_user import (
     BaseUserManager, AbstractBaseUser
 )
-from django.core.files.storage import FileSystemStorage
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.conf import settings
+from django.db import transaction, connections
+from django.utils import timezone
 
 import sys
 
+from .utils import bulk_update
+
 
 class Beacon(models.Model):
     beacon_id = models.CharField(max_length=200, primary_key=True)
@@ -57,6 +62,53 @@ class UserManager(BaseUserManager):
         user.role = admin_role
         user.save()
 
+    # Counters which may be changed by add_to_counters
+    COUNTER_FIELDS = ('earned_coins', 'experience_point')
+
+    def add_to_counters(self, email, **deltas):
+        """Atomically add amounts to the counters of an user
+
+        Only the given columns are written, with a single
+        `UPDATE ... SET column = column + delta ... RETURNING` statement,
+        so concurrent updates never overwrite each other.
+
+        Args:
+            email (str): email of the user
+            **deltas (int): amounts keyed by the names in COUNTER_FIELDS,
+                negative amounts decrease the counter
+
+        Returns:
+            dict: new values of the changed counters keyed by field name,
+                None if the user does not exist
+
+        """
+        if not deltas or not set(deltas) <= set(self.COUNTER_FIELDS):
+            raise ValueError('Unknown counter fields.')
+
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        names = sorted(deltas)
+        columns = [
+            quote_name(self.model._meta.get_field(name).column)
+            for name in names
+        ]
+
+        sql = 'UPDATE {table} SET {assignments} WHERE {pk} = %s RETURNING {columns}'.format(
+            table=quote_name(self.model._meta.db_table),
+            assignments=', '.join(
+                '{0} = {0} + %s'.format(column) for column in columns
+            ),
+            pk=quote_name(self.model._meta.pk.column),
+            columns=', '.join(columns)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [int(deltas[name]) for name in names] + [email])
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return dict(zip(names, row))
+
 
 class User(AbstractBaseUser):
     email = models.EmailField(max_length=255, unique=True, primary_key=True)
@@ -111,8 +163,14 @@ class User(AbstractBaseUser):
 class UserVisitedBeacons(models.Model):
     user = models.ForeignKey('User', on_delete=models.CASCADE)
     beacon = models.ForeignKey('Beacon', on_delete=models.CASCADE)
-    # Automatically record the time this entry created
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Record the time this entry created unless the sighting time is given
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Visit history of an user, newest first
+            models.Index(fields=['user', 'timestamp'], name='visit_user_timestamp_idx'),
+        ]
 
 
 class UserGroup(models.Model):
@@ -135,6 +193,8 @@ class Reward(models.Model):
         null=True,
         blank=True
     )
+    # Automatically record the time this entry last changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -146,6 +206,12 @@ class UserReward(models.Model):
     # Automatically record the time this entry created
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Rewards of an user in the order they were received
+            models.Index(fields=['user', 'timestamp'], name='userreward_user_time_idx'),
+        ]
+
 
 class Permission:
     VIEW = 0x01
@@ -201,16 +267,54 @@ class Choice(models.Model):
     content = models.CharField(max_length=50)
     is_answer = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Choices of a question in the order they were added
+            models.Index(fields=['question', 'id'], name='choice_question_id_idx'),
+        ]
+
     def __repr__(self):
         return str(self.id)
 
 
+class StationQuerySet(models.QuerySet):
+    def with_listing_data(self):
+        """Fetch what the station list pages show with a fixed number of queries
+
+        The category and owner group are joined and the linked beacons are
+        prefetched into `linked_beacons`, so a page costs two queries
+        whatever its size. The primary image is read from the station row.
+
+        """
+        return self.select_related(
+            'category',
+            'owner_group'
+        ).prefetch_related(
+            models.Prefetch(
+                'beacon_set',
+                queryset=Beacon.objects.order_by('beacon_id'),
+                to_attr='linked_beacons'
+            )
+        )
+
+
 class Station(models.Model):
     name = models.CharField(max_length=254, unique=True)
     content = models.TextField(blank=True)
     category = models.ForeignKey('StationCategory', null=True, on_delete=models.SET_NULL)
     location = models.PointField(srid=4326, null=True, blank=True)
     owner_group = models.ForeignKey('UserGroup', null=True, on_delete=models.SET_NULL)
+    # Automatically record the time this entry last changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Copies of the StationImage paths, kept in sync by refresh_images()
+    primary_image_path = models.CharField(max_length=100, blank=True)
+    other_image_paths = ArrayField(
+        models.CharField(max_length=100),
+        default=list,
+        blank=True
+    )
+
+    objects = StationQuerySet.as_manager()
 
     def __str__(self):
         return '{name} ({category})'.format(
@@ -225,13 +329,8 @@ class Station(models.Model):
             str: Image URL if the primary station image exists, None otherwise.
 
         """
-        primary_image = StationImage.objects.filter(
-            station=self,
-            is_primary=True
-        ).first()
-
-        if primary_image:
-            return primary_image.image.url
+        if self.primary_image_path:
+            return default_storage.url(self.primary_image_path)
         return None
 
     def get_other_images(self):
@@ -241,17 +340,36 @@ class Station(models.Model):
             dict: Other Images URLs
 
         """
-        others_image = StationImage.objects.filter(
-            station=self,
-            is_primary=False
-        ).order_by('id')
-
-        images_url = [
-            image.image.url
-            for image in others_image
+        return [
+            default_storage.url(image_path)
+            for image_path in self.other_image_paths
         ]
 
-        return images_url
+    def refresh_images(self):
+        """Copy the paths of the station images into the station row
+
+        Has to be called whenever a StationImage of the station is added,
+        deleted or changes its primary flag.
+
+        """
+        images = StationImage.objects.filter(
+            station_id=self.id
+        ).order_by('id').values_list('image', 'is_primary')
+
+        self.primary_image_path = next(
+            (image for image, is_primary in images if is_primary),
+            ''
+        )
+        self.other_image_paths = [
+            image for image, is_primary in images if not is_primary
+        ]
+        # Saved after the images, so that post_save tells the caches that
+        # the station changed once the copies are up to date
+        self.save(update_fields=[
+            'primary_image_path',
+            'other_image_paths',
+            'updated_at'
+        ])
 
 
 class StationCategory(models.Model):
@@ -266,6 +384,15 @@ class StationImage(models.Model):
     station = models.ForeignKey('Station', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='images/station/')
     is_primary = models.BooleanField(default=False)
+    # Automatically record the time this entry last changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Images of a station in the order they were added, the primary
+            # one is found with the partial index of the one-primary constraint
+            models.Index(fields=['station', 'id'], name='stationimage_station_id_idx'),
+        ]
 
     def __repr__(self):
         return 'Image {img_id}'.format(img_id=self.id)
@@ -283,10 +410,71 @@ class TravelPlan(models.Model):
         blank=True,
         upload_to="images/travel_plan/"
     )
+    # Automatically record the time this entry last changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
+    def diff_station_order(self, current, station_ids):
+        """Compare the stations of the plan with the given order
+
+        Args:
+            current (iterable): the `TravelPlanStations` rows of the plan
+            station_ids (list of int): ids of the stations in visiting order
+
+        Returns:
+            tuple: (rows to create, rows whose order changed, rows to delete)
+
+        """
+        existing = {
+            travelplanstation.station_id: travelplanstation
+            for travelplanstation in current
+        }
+        seen = set()
+        to_create = []
+        to_update = []
+
+        for order, station_id in enumerate(station_ids):
+            if station_id in seen:
+                continue
+            seen.add(station_id)
+
+            travelplanstation = existing.pop(station_id, None)
+            if travelplanstation is None:
+                to_create.append(TravelPlanStations(
+                    travelplan=self,
+                    station_id=station_id,
+                    order=order
+                ))
+            elif travelplanstation.order != order:
+                travelplanstation.order = order
+                to_update.append(travelplanstation)
+
+        return to_create, to_update, list(existing.values())
+
+    def set_station_order(self, station_ids):
+        """Make the stations of the plan follow the given order
+
+        The current rows are loaded once and the difference is applied
+        in one transaction with a bulk INSERT, UPDATE and DELETE.
+
+        Args:
+            station_ids (list of int): ids of the stations in visiting order
+
+        """
+        with transaction.atomic():
+            to_create, to_update, to_delete = self.diff_station_order(
+                TravelPlanStations.objects.filter(travelplan=self).select_for_update(),
+                station_ids
+            )
+            if to_delete:
+                TravelPlanStations.objects.filter(
+                    pk__in=[travelplanstation.pk for travelplanstation in to_delete]
+                ).delete()
+            bulk_update(TravelPlanStations, to_update, ['order'])
+            TravelPlanStations.objects.bulk_create(to_create)
+
 
 class TravelPlanStations(models.Model):
     travelplan = models.ForeignKey('TravelPlan', on_delete=models.CASCADE)
@@ -295,3 +483,50 @@ class TravelPlanStations(models.Model):
 
     class Meta:
         ordering = ('order',)
+        indexes = [
+            models.Index(fields=['travelplan', 'order'], name='travelplan_station_order_idx'),
+        ]
+
+
+class Tombstone(models.Model):
+    """Record of a deleted entry, consumed by the delta sync API"""
+    model_name = models.CharField(max_length=50)
+    object_id = models.IntegerField()
+    # Automatically record the time this entry created
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class VisitRollup(models.Model):
+    """Visits aggregated per hour or day, rebuilt by the rollup_visits command"""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = (
+        (HOUR, 'hour'),
+        (DAY, 'day'),
+    )
+
+    period = models.CharField(max_length=4, choices=PERIODS)
+    # Start of the hour or day
+    start = models.DateTimeField()
+    visits = models.IntegerField()
+    # Distinct users in the period
+    visitors = models.IntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class BeaconVisitRollup(VisitRollup):
+    beacon = models.ForeignKey('Beacon', on_delete=models.CASCADE)
+
+    class Meta:
+        # Also serves the dashboard, which reads a range of a period
+        unique_together = ('period', 'start', 'beacon')
+
+
+class StationVisitRollup(VisitRollup):
+    """Visits of the beacons linked to the station when they were rolled up"""
+    station = models.ForeignKey('Station', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('period', 'start', 'station')
@@ -0,0 +1,142 @@
+from django.db import connection, transaction
+
+from datetime import date
+import re
+
+from .models import UserVisitedBeacons
+
+
+VISITS_TABLE = UserVisitedBeacons._meta.db_table
+PARTITION_NAME = '{0}_y{1:04d}m{2:02d}'
+DEFAULT_PARTITION = VISITS_TABLE + '_default'
+PARTITION_PATTERN = re.compile(r'^' + VISITS_TABLE + r'_y(\d{4})m(\d{2})$')
+
+# Declarative partitioning with indexes and foreign keys on the parent
+MIN_PG_VERSION = 110000
+
+
+def add_months(month, count):
+    """Move the first day of a month by `count` months"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(moment):
+    return date(moment.year, moment.month, 1)
+
+
+def partition_name(month):
+    return PARTITION_NAME.format(VISITS_TABLE, month.year, month.month)
+
+
+def is_partitioned():
+    """Whether the visit log was turned into a partitioned table"""
+    if connection.vendor != 'postgresql' or connection.pg_version < MIN_PG_VERSION:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+            [VISITS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Get the monthly partitions attached to the visit log
+
+    Returns:
+        list of :obj: `date`: first day of the month of each partition, sorted
+
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [VISITS_TABLE]
+        )
+        names = [name for name, in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(month):
+    """Create the partition of the visits of a month
+
+    Visits of a month without partition land in the DEFAULT partition,
+    which would make attaching the month fail. They are moved to the new
+    table before it is attached, in one transaction.
+
+    """
+    table = partition_name(month)
+    bounds = ['{0} 00:00:00+00'.format(month), '{0} 00:00:00+00'.format(add_months(month, 1))]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [table])
+        if cursor.fetchone()[0] is not None:
+            return
+
+        cursor.execute('CREATE TABLE {0} (LIKE {1} INCLUDING DEFAULTS)'.format(
+            table, VISITS_TABLE
+        ))
+        cursor.execute(
+            """
+            WITH moved AS (
+                DELETE FROM {0} WHERE timestamp >= %s AND timestamp < %s RETURNING *
+            )
+            INSERT INTO {1} SELECT * FROM moved
+            """.format(DEFAULT_PARTITION, table),
+            bounds
+        )
+        cursor.execute(
+            'ALTER TABLE {0} ATTACH PARTITION {1} FOR VALUES FROM (%s) TO (%s)'.format(
+                VISITS_TABLE, table
+            ),
+            bounds
+        )
+
+
+def detach_partition(month):
+    """Detach the partition of a month, it is kept as a standalone table
+
+    The detached table keeps copies of the foreign keys to the users and
+    the beacons, which the delete cascade of Django does not reach, so they
+    are dropped: deleting an user or a beacon would fail otherwise.
+
+    """
+    table = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE {0} DETACH PARTITION {1}'.format(VISITS_TABLE, table))
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        for name, in cursor.fetchall():
+            cursor.execute('ALTER TABLE {0} DROP CONSTRAINT {1}'.format(
+                table, connection.ops.quote_name(name)
+            ))
+
+
+def archive_partition(month, output):
+    """Write the rows of a detached partition as csv, then drop it
+
+    Args:
+        month (:obj: `date`): first day of the month of the partition
+        output (file): binary file the csv is written to
+
+    """
+    table = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            'COPY {0} TO STDOUT WITH (FORMAT csv, HEADER)'.format(table),
+            output
+        )
+        cursor.execute('DROP TABLE {0}'.format(table))
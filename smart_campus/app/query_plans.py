@@ -0,0 +1,90 @@
+from django.db import connection, transaction
+
+import re
+
+from .models import (
+    User, UserVisitedBeacons, UserReward, Question, Choice,
+    Station, StationImage, TravelPlan, TravelPlanStations
+)
+
+
+SEQ_SCAN_PATTERN = re.compile(r'Seq Scan on (\w+)')
+
+
+def get_hot_queries(user_id, station_id, question_id, travelplan_id):
+    """The lookups run on most requests, with the given sample ids
+
+    Returns:
+        list of tuple: (label, queryset)
+
+    """
+    return [
+        ('station images', StationImage.objects.filter(
+            station_id=station_id
+        ).order_by('id').values_list('image', 'is_primary')),
+        ('primary station image', StationImage.objects.filter(
+            station_id=station_id,
+            is_primary=True
+        )),
+        ('station question ids', Question.objects.filter(
+            linked_station_id=station_id
+        ).order_by('id').values_list('id', flat=True)),
+        ('answered question ids', User.answered_questions.through.objects.filter(
+            user_id=user_id
+        ).values_list('question_id', flat=True)),
+        ('question choices', Choice.objects.filter(
+            question_id=question_id
+        ).order_by('id')),
+        ('visited beacons', UserVisitedBeacons.objects.filter(
+            user_id=user_id
+        ).order_by('-timestamp')),
+        ('user rewards', UserReward.objects.filter(
+            user_id=user_id
+        ).order_by('timestamp')),
+        ('travel plan stations', TravelPlanStations.objects.filter(
+            travelplan_id=travelplan_id
+        ).order_by('order')),
+    ]
+
+
+def _sample_id(queryset, default):
+    pk = queryset.order_by('pk').values_list('pk', flat=True).first()
+    return default if pk is None else pk
+
+
+def explain_hot_queries(disable_seqscan=False):
+    """Run EXPLAIN on the hot queries, with ids taken from the database
+
+    The planner prefers sequential scans on small tables, with
+    `disable_seqscan` they are only chosen when no index can serve the query.
+
+    Returns:
+        list of dict: 'label', 'plan' as a list of lines, and 'seq_scans',
+            the tables read with a sequential scan
+
+    """
+    queries = get_hot_queries(
+        user_id=_sample_id(User.objects, ''),
+        station_id=_sample_id(Station.objects, 0),
+        question_id=_sample_id(Question.objects, 0),
+        travelplan_id=_sample_id(TravelPlan.objects, 0)
+    )
+
+    reports = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if disable_seqscan:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for label, queryset in queries:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN ' + sql, params)
+            plan = [line for line, in cursor.fetchall()]
+            reports.append({
+                'label': label,
+                'plan': plan,
+                'seq_scans': sorted({
+                    match.group(1)
+                    for line in plan
+                    for match in SEQ_SCAN_PATTERN.finditer(line)
+                }),
+            })
+    return reports
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from array import array
+from bisect import bisect_left
+import random
+
+from .catalog import get_versions
+from .models import User, Question, Choice
+
+
+def get_station_question_ids(station_id):
+    """Get the ids of the questions linked to a station
+
+    The ids are cached per station and dropped whenever a question changes.
+
+    Returns:
+        tuple of int: sorted question ids
+
+    """
+    version, = get_versions(('app.question',))
+    key = 'questions:station:{0}:{1}'.format(station_id, version)
+
+    question_ids = cache.get(key)
+    if question_ids is None:
+        question_ids = tuple(Question.objects.filter(
+            linked_station_id=station_id
+        ).order_by('id').values_list('id', flat=True))
+        cache.set(key, question_ids, settings.QUESTION_CACHE_TIMEOUT)
+    return question_ids
+
+
+def _answered_key(user_id):
+    return 'questions:answered:{0}'.format(user_id)
+
+
+def get_answered_question_ids(user_id):
+    """Get the ids of the questions the user answered
+
+    The ids are cached as a packed sorted array of 64-bit integers, so
+    that even a long answer history takes little cache space.
+
+    Returns:
+        :obj: `array.array`: sorted question ids
+
+    """
+    packed = cache.get(_answered_key(user_id))
+    if packed is not None:
+        question_ids = array('q')
+        question_ids.frombytes(packed)
+        return question_ids
+
+    question_ids = array('q', sorted(User.answered_questions.through.objects.filter(
+        user_id=user_id
+    ).values_list('question_id', flat=True)))
+    cache.set(
+        _answered_key(user_id),
+        question_ids.tobytes(),
+        settings.QUESTION_CACHE_TIMEOUT
+    )
+    return question_ids
+
+
+def add_answered_question_id(user_id, question_id):
+    """Add a question to the cached answered ids of the user
+
+    Has to be called after the answer is saved. Nothing is cached for an
+    user who has not asked for a question yet, the ids are loaded then.
+
+    """
+    packed = cache.get(_answered_key(user_id))
+    if packed is None:
+        return
+
+    question_ids = array('q')
+    question_ids.frombytes(packed)
+    if not _contains(question_ids, question_id):
+        question_ids.insert(bisect_left(question_ids, question_id), question_id)
+        cache.set(
+            _answered_key(user_id),
+            question_ids.tobytes(),
+            settings.QUESTION_CACHE_TIMEOUT
+        )
+
+
+def _contains(sorted_ids, question_id):
+    index = bisect_left(sorted_ids, question_id)
+    return index < len(sorted_ids) and sorted_ids[index] == question_id
+
+
+def pick_unanswered_question(user_id, station_id):
+    """Pick a random question of the station the user has not answered yet
+
+    The candidates are the cached question ids of the station minus the
+    cached answered ids of the user, the picked question is then loaded together with its
+    choices in one query.
+
+    Returns:
+        tuple: (question, list of its choices ordered by id), None if every
+            question of the station is answered
+
+    """
+    answered = get_answered_question_ids(user_id)
+    candidates = [
+        question_id
+        for question_id in get_station_question_ids(station_id)
+        if not _contains(answered, question_id)
+    ]
+    if not candidates:
+        return None
+
+    question_id = random.choice(candidates)
+    choices = list(Choice.objects.filter(
+        question_id=question_id
+    ).select_related('question').order_by('id'))
+    if choices:
+        return choices[0].question, choices
+
+    # A question without choices, or one deleted since the ids were cached
+    question = Question.objects.filter(pk=question_id).first()
+    if question is None:
+        return None
+    return question, []
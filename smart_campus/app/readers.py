@@ -0,0 +1,138 @@
+import csv
+import importlib.util
+import json
+import math
+import os
+
+
+OPTIONAL_REQUIREMENTS_HINT = 'install the optional requirements with "pip install -r requirements/optional.txt"'
+
+
+def cell_text(value):
+    """Normalize a cell, empty cells come as None or NaN"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store numeric ids as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _csv_rows(path):
+    # utf-8-sig drops the byte order mark written by Excel
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        for row in csv.reader(csv_file):
+            yield row
+
+
+def _xlsx_rows(path):
+    import openpyxl
+
+    # The read only mode parses the sheet while it is iterated
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows():
+            yield [cell.value for cell in row]
+    finally:
+        workbook.close()
+
+
+def _xls_rows(path):
+    import xlrd
+
+    # The legacy format can not be streamed, only the other sheets are skipped
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for index in range(sheet.nrows):
+            yield sheet.row_values(index)
+    finally:
+        workbook.release_resources()
+
+
+# Optional packages needed by the readers, see requirements/optional.txt
+READER_REQUIREMENTS = {
+    '.xlsx': 'openpyxl',
+    '.xls': 'xlrd',
+}
+
+
+def _records(rows):
+    """Turn rows into dicts keyed by the column names of the first row"""
+    header = None
+    for row in rows:
+        if all(value is None or value == '' for value in row):
+            continue
+        if header is None:
+            header = [str(value).strip() if value is not None else '' for value in row]
+            continue
+        yield dict(zip(header, row))
+
+
+def _jsonl_records(path):
+    with open(path, encoding='utf-8') as jsonl_file:
+        for line_number, line in enumerate(jsonl_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                raise ValueError('Line {0} is not a JSON object'.format(line_number))
+            yield record
+
+
+RECORD_READERS = {
+    '.csv': lambda path: _records(_csv_rows(path)),
+    '.xlsx': lambda path: _records(_xlsx_rows(path)),
+    '.xls': lambda path: _records(_xls_rows(path)),
+    '.jsonl': _jsonl_records,
+}
+
+
+def read_chunks(path, chunk_size):
+    """Read the rows of a spreadsheet or JSON Lines file in chunks of at
+    most `chunk_size`
+
+    The first non-empty row of a sheet holds the column names, each line
+    of a JSON Lines file holds an object. Only one chunk is kept in memory
+    at a time, except for .xls files which xlrd loads at once.
+
+    Args:
+        path (str): path of a .csv, .xlsx, .xls or .jsonl file, the first
+            sheet is read
+        chunk_size (int): maximum number of rows per chunk
+
+    Returns:
+        generator: lists of rows, each a dict of cells keyed by column name
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+        ValueError: if the format is not supported or its reader is not installed
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in RECORD_READERS:
+        raise ValueError('Unsupported file format {0}, use one of {1}'.format(
+            extension or path, ', '.join(sorted(RECORD_READERS))
+        ))
+    requirement = READER_REQUIREMENTS.get(extension)
+    if requirement and importlib.util.find_spec(requirement) is None:
+        raise ValueError('Reading {0} files needs {1}, {2}'.format(
+            extension, requirement, OPTIONAL_REQUIREMENTS_HINT
+        ))
+    if not os.path.isfile(path):
+        raise FileNotFoundError('No such file: {0}'.format(path))
+
+    def chunks():
+        chunk = []
+        for record in RECORD_READERS[extension](path):
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    return chunks()
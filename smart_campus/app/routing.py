@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import threading
+
+from .catalog import get_versions, bump_version
+from .models import Beacon
+
+
+# Change counter of the beacon topology, shared by every process
+ROUTING_VERSION_LABEL = 'app.beacon_station'
+
+
+class BeaconRoutingTable(object):
+    """Per-process map from beacon id to the ids of its linked stations
+
+    The table is loaded with one query on first use and dropped whenever
+    the beacon topology changes. Changes made by other processes are
+    noticed through the shared change counter, so a lookup costs a cache
+    read but never a database query while the topology is stable.
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Drop the table of every process"""
+        with self.lock:
+            self.table = None
+        bump_version(ROUTING_VERSION_LABEL)
+
+    def _get_table(self):
+        version, = get_versions((ROUTING_VERSION_LABEL,))
+
+        with self.lock:
+            if self.table is not None and self.version == version:
+                self.hits += 1
+                return self.table
+            self.misses += 1
+
+        table = {}
+        rows = Beacon.objects.values_list('beacon_id', 'station').order_by('station')
+        for beacon_id, station_id in rows:
+            station_ids = table.setdefault(beacon_id, ())
+            if station_id is not None:
+                table[beacon_id] = station_ids + (station_id,)
+
+        with self.lock:
+            self.table = table
+            self.version = version
+        return table
+
+    def get(self, beacon_id):
+        """Get the stations linked to a beacon
+
+        Returns:
+            tuple of int: ids of the linked stations, None if the beacon
+                does not exist
+
+        """
+        return self._get_table().get(beacon_id)
+
+    def get_many(self, beacon_ids):
+        """Get the stations linked to each beacon
+
+        Returns:
+            OrderedDict: tuple of the ids of the linked stations keyed by
+                the id of each existing beacon, unknown beacons are left out
+
+        """
+        table = self._get_table()
+        linked_stations = OrderedDict()
+        for beacon_id in sorted(set(beacon_ids)):
+            if beacon_id in table:
+                linked_stations[beacon_id] = table[beacon_id]
+        return linked_stations
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'beacons': len(self.table) if self.table is not None else 0,
+        }
+
+
+routing_table = BeaconRoutingTable()
@@ -0,0 +1,87 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .catalog import bump_version
+from .context_processors import category_navigation
+from .models import (
+    Beacon, Station, StationImage, StationCategory,
+    Reward, TravelPlan, Tombstone, Question
+)
+from .routing import routing_table
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=StationImage)
+@receiver(post_delete, sender=StationImage)
+@receiver(post_save, sender=StationCategory)
+@receiver(post_delete, sender=StationCategory)
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+@receiver(post_save, sender=TravelPlan)
+@receiver(post_delete, sender=TravelPlan)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def catalog_changed(sender, **kwargs):
+    bump_version(sender._meta.label_lower)
+
+
+@receiver(post_delete, sender=Station)
+@receiver(post_delete, sender=StationImage)
+@receiver(post_delete, sender=Reward)
+@receiver(post_delete, sender=TravelPlan)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model_name=sender._meta.label_lower,
+        object_id=instance.pk
+    )
+
+
+@receiver(post_save, sender=StationImage)
+@receiver(post_delete, sender=StationImage)
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+def touch_related_station(sender, instance, **kwargs):
+    """The station payload embeds its images and rewards, so the station
+    has to show up in the next delta sync as well"""
+    station_id = (
+        instance.station_id
+        if sender is StationImage else instance.related_station_id
+    )
+    if station_id:
+        Station.objects.filter(pk=station_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Station)
+def touch_travel_plans(sender, instance, **kwargs):
+    """Deleting a station removes it from the station sequence of plans"""
+    TravelPlan.objects.filter(
+        travelplanstations__station=instance
+    ).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=StationCategory)
+@receiver(pre_delete, sender=StationCategory)
+def touch_category_stations(sender, instance, created=False, **kwargs):
+    """The station payload embeds the category name, so its stations have
+    to show up in the next delta sync; touched before a deletion, which
+    empties their category"""
+    if not created:
+        Station.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Beacon.station.through)
+@receiver(post_save, sender=Beacon)
+@receiver(post_delete, sender=Beacon)
+@receiver(post_delete, sender=Station)
+def beacon_topology_changed(sender, **kwargs):
+    routing_table.invalidate()
+
+
+@receiver(post_save, sender=StationCategory)
+@receiver(post_delete, sender=StationCategory)
+def categories_changed(sender, **kwargs):
+    """Other processes notice the change through the counter bumped by
+    `catalog_changed`"""
+    category_navigation.invalidate()
@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, CharField, Count, F, FloatField, Func, Value
+
+import json
+import math
+
+from .catalog import get_request_versions
+from .models import Station
+
+
+# Meters per degree of latitude, and of longitude at the equator
+METERS_PER_DEGREE = 111320.0
+
+
+def degrees_for_distance(meters, latitude):
+    """Convert a distance into degrees wide enough in every direction
+
+    A degree of longitude shrinks with the cosine of the latitude, so the
+    longitude span is the larger one. Used for the bounding box tests of
+    the GiST index, the exact distance is checked afterwards.
+
+    """
+    cosine = max(math.cos(math.radians(min(abs(latitude), 89.0))), 0.01)
+    return meters / (METERS_PER_DEGREE * cosine)
+
+
+def find_nearby_stations(latitude, longitude, radius, limit, category_ids=None):
+    """Find the stations closest to a point
+
+    The candidates are first narrowed by a bounding box in degrees, which
+    is answered by the spatial index, then filtered and ordered by the
+    exact distance on the sphere. The `<->` operator is not used: on
+    longitude and latitude it orders by planar degrees, which may put a
+    farther station first and drop the nearest one from the limit.
+
+    Args:
+        latitude (float): latitude of the point
+        longitude (float): longitude of the point
+        radius (float): maximum distance in meters
+        limit (int): maximum number of stations
+        category_ids (list of int): only return stations of these categories
+
+    Returns:
+        list of :obj: `Station`: closest first, with `distance` annotated
+
+    """
+    point = Point(x=longitude, y=latitude, srid=4326)
+
+    stations = Station.objects.select_related('category').filter(
+        location__dwithin=(point, degrees_for_distance(radius, latitude))
+    ).filter(
+        location__distance_lte=(point, D(m=radius))
+    )
+    if category_ids:
+        stations = stations.filter(category_id__in=category_ids)
+
+    return list(stations.annotate(
+        distance=Distance('location', point)
+    ).order_by('distance', 'id')[:limit])
+
+
+# Models whose changes are visible in the station map tiles
+STATION_TILE_MODELS = ('app.station', 'app.stationcategory')
+
+MAX_TILE_ZOOM = 22
+
+
+def tile_bounds(zoom, x, y):
+    """Get the bounds of a web mercator map tile
+
+    Returns:
+        tuple of float: (west, south, east, north) in degrees
+
+    """
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2.0 * tile_y / 2 ** zoom))))
+
+    def longitude(tile_x):
+        return tile_x / 2.0 ** zoom * 360.0 - 180.0
+
+    return longitude(x), latitude(y + 1), longitude(x + 1), latitude(y)
+
+
+def geohash_precision(zoom):
+    """Length of the geohashes splitting a tile into about 8 by 8 cells
+
+    A geohash of length p has ceil(5p / 2) bits of longitude, a tile of
+    zoom z has z, so 3 more bits give 8 cells across.
+
+    """
+    return max(1, min(12, int(round(2 * (zoom + 3) / 5.0))))
+
+
+def _tile_stations(bbox, limit):
+    stations = Station.objects.select_related('category').filter(
+        location__bboverlaps=bbox
+    ).order_by('id')[:limit]
+
+    return [
+        {
+            'id': station.id,
+            'name': station.name,
+            'category': str(station.category),
+            'location': station.location.get_coords(),
+        }
+        for station in stations
+    ]
+
+
+def _tile_clusters(bbox, zoom):
+    clusters = Station.objects.filter(
+        location__bboverlaps=bbox
+    ).annotate(
+        cell=Func(
+            F('location'),
+            Value(geohash_precision(zoom)),
+            function='ST_GeoHash',
+            output_field=CharField()
+        )
+    ).values('cell').annotate(
+        count=Count('id'),
+        longitude=Avg(Func(F('location'), function='ST_X', output_field=FloatField())),
+        latitude=Avg(Func(F('location'), function='ST_Y', output_field=FloatField()))
+    ).order_by('cell')
+
+    return [
+        {
+            'geohash': cluster['cell'],
+            'count': cluster['count'],
+            'location': (cluster['longitude'], cluster['latitude']),
+        }
+        for cluster in clusters
+    ]
+
+
+def build_station_tile(zoom, x, y):
+    """Serialize the stations of a map tile
+
+    Stations are listed from zoom STATION_TILE_CLUSTER_ZOOM on, unless a
+    tile holds more than STATION_TILE_MAX_STATIONS of them. Otherwise they
+    are counted per geohash cell. The tile is selected with the `&&`
+    bounding box operator, answered by the GiST index of the locations.
+
+    Returns:
+        bytes: utf-8 encoded json document
+
+    """
+    bbox = Polygon.from_bbox(tile_bounds(zoom, x, y))
+    bbox.srid = 4326
+
+    stations = None
+    if zoom >= settings.STATION_TILE_CLUSTER_ZOOM:
+        stations = _tile_stations(bbox, settings.STATION_TILE_MAX_STATIONS + 1)
+        if len(stations) > settings.STATION_TILE_MAX_STATIONS:
+            stations = None
+
+    data = {
+        'zoom': zoom,
+        'clustered': stations is None,
+        'data': _tile_clusters(bbox, zoom) if stations is None else stations,
+    }
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+def get_station_tile(request, zoom, x, y):
+    """Get a station map tile from the cache, building it if needed
+
+    Tiles are cached per tile key and change counters, so a tile is built
+    once until a station or category changes.
+
+    Returns:
+        bytes: utf-8 encoded json document
+
+    """
+    versions = get_request_versions(request, STATION_TILE_MODELS)
+    key = 'tiles:stations:{0}:{1}:{2}:{3}'.format(
+        zoom, x, y, '.'.join(str(version) for version in versions)
+    )
+
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_station_tile(zoom, x, y)
+        cache.set(key, tile, settings.STATION_TILE_CACHE_TIMEOUT)
+    return tile
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.utils import timezone
+
+from datetime import datetime, timedelta
+
+from .catalog import serialize_station
+from .models import Station, StationImage, Reward, TravelPlan, Tombstone
+
+
+# Keys of the delta feed, mapped to the models they carry
+SYNC_MODELS = (
+    ('stations', Station),
+    ('station_images', StationImage),
+    ('rewards', Reward),
+    ('travel_plans', TravelPlan),
+)
+
+
+def encode_cursor(moment):
+    """Encode a datetime as an opaque cursor (microseconds since epoch)"""
+    return str(int(moment.timestamp() * 1000000))
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by `encode_cursor`
+
+    Raises:
+        ValueError: if the cursor is malformed
+
+    """
+    return datetime.fromtimestamp(int(cursor) / 1000000, tz=timezone.utc)
+
+
+def serialize_station_image(image, url_prefix):
+    return {
+        'id': image.id,
+        'station': image.station_id,
+        'url': '{0}{1}'.format(url_prefix, image.image.url),
+        'is_primary': image.is_primary,
+    }
+
+
+def serialize_reward(reward, url_prefix):
+    return {
+        'id': reward.id,
+        'name': reward.name,
+        'description': reward.description,
+        'related_station': reward.related_station_id,
+        'image_url': '{0}{1}'.format(url_prefix, reward.image.url) if reward.image else '',
+    }
+
+
+def serialize_travel_plan(plan, url_prefix):
+    return {
+        'id': plan.id,
+        'name': plan.name,
+        'description': plan.description,
+        'station_sequence': [
+            travelplanstation.station_id
+            for travelplanstation in sorted(
+                plan.travelplanstations_set.all(),
+                key=lambda travelplanstation: travelplanstation.order
+            )
+        ],
+        'image': '{0}{1}'.format(url_prefix, plan.image.url) if plan.image else '',
+    }
+
+
+def get_changes(since, url_prefix):
+    """Collect the entries changed after `since`
+
+    Args:
+        since (:obj: `datetime`): time of the previous sync, None for a full sync
+        url_prefix (str): scheme and host prepended to the image urls
+
+    Returns:
+        dict: a json-liked dict formatting with::
+            {
+                'cursor': cursor to send as `since` in the next sync, the
+                    changes of the last SYNC_CURSOR_OVERLAP_SECONDS are sent
+                    again then,
+                'full_sync': whether the client has to drop its local copy,
+                'stations': changed stations,
+                'station_images': changed station images,
+                'rewards': changed rewards,
+                'travel_plans': changed travel plans,
+                'deleted': {
+                    'stations': ids of deleted stations,
+                    ...
+                }
+            }
+
+    """
+    # Taken before the queries so that changes made meanwhile are
+    # returned again by the next sync instead of being skipped
+    now = timezone.now()
+    # `updated_at` is set on save, before the commit, so a row saved just
+    # before `now` may only become visible later. The cursor is moved back
+    # so that the next sync returns the recent changes again.
+    cursor = now - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS)
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+    # Deletions older than the retention are forgotten, such a client
+    # can only catch up with a full sync
+    full_sync = since is None or since < now - retention
+
+    querysets = {
+        'stations': Station.objects.select_related(
+            'category'
+        ).prefetch_related(
+            'reward_set'
+        ),
+        'station_images': StationImage.objects.all(),
+        'rewards': Reward.objects.all(),
+        'travel_plans': TravelPlan.objects.prefetch_related(
+            'travelplanstations_set'
+        ),
+    }
+    serializers = {
+        'stations': serialize_station,
+        'station_images': serialize_station_image,
+        'rewards': serialize_reward,
+        'travel_plans': serialize_travel_plan,
+    }
+
+    data = {
+        'cursor': encode_cursor(cursor),
+        'full_sync': full_sync,
+        'deleted': {key: [] for key, model in SYNC_MODELS},
+    }
+
+    for key, model in SYNC_MODELS:
+        queryset = querysets[key]
+        if not full_sync:
+            queryset = queryset.filter(updated_at__gt=since)
+        data[key] = [
+            serializers[key](instance, url_prefix)
+            for instance in queryset.order_by('id')
+        ]
+
+    if not full_sync:
+        keys = {model._meta.label_lower: key for key, model in SYNC_MODELS}
+        tombstones = Tombstone.objects.filter(
+            model_name__in=keys,
+            deleted_at__gt=since
+        ).values_list('model_name', 'object_id')
+        for model_name, object_id in tombstones:
+            data['deleted'][keys[model_name]].append(object_id)
+
+    return data
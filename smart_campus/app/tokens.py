@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core import signing
 from django.utils import six
 
 
@@ -7,4 +9,49 @@ class AccountActivationTokenGenerator(PasswordResetTokenGenerator):
         return (six.text_type(user.pk) + six.text_type(timestamp) + six.text_type(user.email_confirmed))
 
 
+class APITokenGenerator(object):
+    """Stateless authentication tokens of the mobile app
+
+    A token carries the user's email, a timestamp and an HMAC signature, so
+    it is verified without any database or session lookup. Tokens expire
+    after API_TOKEN_MAX_AGE seconds. They are signed with the first key of
+    API_TOKEN_SECRET_KEYS and accepted with any of them: to rotate the key,
+    prepend a new one and drop the old one once API_TOKEN_MAX_AGE passed.
+
+    """
+    key_salt = 'app.tokens.APITokenGenerator'
+
+    def _get_keys(self):
+        return getattr(settings, 'API_TOKEN_SECRET_KEYS', None) or [settings.SECRET_KEY]
+
+    def make_token(self, user):
+        return signing.dumps(
+            user.pk,
+            key=self._get_keys()[0],
+            salt=self.key_salt
+        )
+
+    def check_token(self, token):
+        """Check a token
+
+        Returns:
+            str: email of the user if the token is valid, None otherwise
+
+        """
+        for key in self._get_keys():
+            try:
+                return signing.loads(
+                    token,
+                    key=key,
+                    salt=self.key_salt,
+                    max_age=settings.API_TOKEN_MAX_AGE
+                )
+            except signing.SignatureExpired:
+                return None
+            except signing.BadSignature:
+                continue
+        return None
+
+
 account_activation_token = AccountActivationTokenGenerator()
+api_token = APITokenGenerator()
@@ -9,12 +9,25 @@ urlpatterns = [
     url('^logout/$', views.logout, name='Logout'),
     url('^get_all_rewards/$', views.get_all_rewards, name='Get All Reward'),
     url('^get_all_stations/$', views.get_all_stations, name='Get All Station'),
+    url('^sync/$', views.sync, name='Sync'),
+    url('^nearby_stations/$', views.nearby_stations,
+        name='Nearby Stations'),
+    url('^station_tiles/(?P<zoom>\d+)/(?P<x>\d+)/(?P<y>\d+)/$', views.station_tile,
+        name='Station Tile'),
     url('^get_linked_stations/$', views.get_linked_stations,
         name='Get Linked Station'),
+    url('^report_beacon_sightings/$', views.report_beacon_sightings,
+        name='Report Beacon Sightings'),
     url('^update_user_coins/$', views.update_user_coins,
         name='Update User Coins'),
     url('^update_user_experience_point/$', views.update_user_experience_point,
         name='Update User Experience Point'),
+    url('^add_user_coins/$', views.add_user_coins,
+        name='Add User Coins'),
+    url('^add_user_experience_point/$', views.add_user_experience_point,
+        name='Add User Experience Point'),
+    url('^add_user_counters/$', views.add_user_counters,
+        name='Add User Counters'),
     url('^add_user_favorite_stations/$', views.add_user_favorite_stations,
         name='Add User Favorite Stations'),
     url('^remove_user_favorite_stations/$',
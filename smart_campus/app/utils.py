@@ -0,0 +1,34 @@
+from django.db.models import Case, When, Value
+from django.db.models.functions import Cast
+
+
+def bulk_update(model, objs, fields, batch_size=500):
+    """Save `fields` of the model instances with one UPDATE per batch
+
+    A backport of `QuerySet.bulk_update()` of later Django versions: every
+    field is set with a CASE expression keyed by the primary key. Signals
+    are not sent and auto_now fields are not touched.
+
+    Args:
+        model (:obj: `Model`): class of the instances
+        objs (list): instances with a primary key
+        fields (list of str): names of the fields to save
+        batch_size (int): maximum number of instances per UPDATE
+
+    """
+    objs = list(objs)
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        updates = {}
+        for name in fields:
+            field = model._meta.get_field(name)
+            case = Case(
+                *[
+                    When(pk=obj.pk, then=Value(getattr(obj, field.attname), output_field=field))
+                    for obj in batch
+                ],
+                output_field=field
+            )
+            # PostgreSQL can not infer the type of a CASE of parameters
+            updates[field.attname] = Cast(case, output_field=field)
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
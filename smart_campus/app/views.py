@@ -1,6 +1,11 @@
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST, require_GET, require_safe
+from django.views.decorators.http import (
+    require_POST,
+    require_GET,
+    require_safe,
+    condition
+)
 from django.contrib import auth
 from django.http import (
     HttpResponseRedirect,
@@ -15,7 +20,8 @@ from django.contrib.gis.geos import Point
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db import IntegrityError
+from django.db import IntegrityError, DataError, transaction
+from django.db.models import Q, Case, When, Value, BooleanField
 from django.core import serializers
 from django.core.exceptions import ValidationError
 from django.core.mail import EmailMessage
@@ -23,9 +29,10 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_text
 from django.contrib.auth.tokens import default_token_generator
+from django.utils import timezone
 
+from datetime import timedelta
 import os
-import random
 import json
 from functools import wraps
 
@@ -36,7 +43,8 @@ from .models import (
     UserReward, UserGroup,
     TravelPlan, Role,
     TravelPlanStations,
-    Choice, UserVisitedBeacons
+    Choice,
+    VisitRollup
 )
 from .forms import (
     PartialStationForm,
@@ -49,7 +57,29 @@ from .forms import (
     QuestionForm,
     PartialManagerForm
 )
-from .tokens import account_activation_token
+from .tokens import account_activation_token, api_token
+from .catalog import (
+    get_station_catalog,
+    get_url_prefix,
+    bump_version,
+    catalog_etag,
+    catalog_last_modified,
+    STATION_CATALOG_MODELS,
+    REWARD_CATALOG_MODELS,
+    TRAVEL_PLAN_CATALOG_MODELS
+)
+from .sync import get_changes, decode_cursor
+from .visits import parse_sightings, record_visits
+from .routing import routing_table
+from .questions import pick_unanswered_question, add_answered_question_id
+from .spatial import (
+    find_nearby_stations,
+    get_station_tile,
+    STATION_TILE_MODELS,
+    MAX_TILE_ZOOM
+)
+from .beacon_links import plan_beacon_links, apply_beacon_links, fingerprint
+from .analytics import get_visit_timeline, get_top_stations
 
 
 def administrator_required(function):
@@ -74,6 +104,29 @@ def activate_required(function):
     return wrapper
 
 
+def api_user_required(function):
+    """Resolve the app user of an API request
+
+    Requests authenticated by `APITokenMiddleware` already carry the email
+    of the user. Requests of app versions without tokens identify the user
+    with a posted email, unless API_TOKEN_REQUIRED rejects them. In both
+    cases `request.api_user` fetches the user on first access only.
+
+    """
+    @wraps(function)
+    def wrapper(request, *args, **kwargs):
+        request.api_user_authenticated = request.api_user_email is not None
+        if not request.api_user_authenticated:
+            if settings.API_TOKEN_REQUIRED:
+                return HttpResponse('Authentication token is required', status=401)
+            request.api_user_email = request.POST.get(
+                'email',
+                request.GET.get('email')
+            )
+        return function(request, *args, **kwargs)
+    return wrapper
+
+
 @csrf_exempt
 @require_POST
 def signup(request):
@@ -121,7 +174,8 @@ def signup(request):
 def login(request):
     """Login API for APP users
 
-    Handle login requests from app
+    Handle login requests from app. Instead of creating a session, return
+    a signed token to send as `Authorization: Token <token>` header.
 
     """
     user_email = request.POST.get('email')
@@ -129,7 +183,6 @@ def login(request):
     user = auth.authenticate(request, username=user_email, password=password)
 
     if user is not None:
-        auth.login(request, user)
         user_data = {
             'nickname': user.nickname,
             'experience_point': user.experience_point,
@@ -146,7 +199,8 @@ def login(request):
         return JsonResponse(
             data={
                 'message': 'Login succeeded',
-                'data': user_data
+                'data': user_data,
+                'token': api_token.make_token(user)
             },
             status=200,
             json_dumps_params={'ensure_ascii': False},
@@ -158,19 +212,17 @@ def login(request):
 
 @csrf_exempt
 @require_POST
+@api_user_required
 def logout(request):
     """Logout API for APP users
 
     Handle logout requests from app
 
     """
-    user_email = request.POST.get('email')
-    request.user = User.objects.filter(email=user_email).first()
-
-    if not request.user:
+    if not request.api_user:
         return HttpResponse('User does not exist', status=404)
 
-    auth.logout(request)
+    # API tokens are stateless, the app logs out by dropping its token
     return HttpResponse('Logout succeeded', status=200)
 
 
@@ -209,23 +261,19 @@ def logout_page(request):
 
 @login_required
 def index(request):
-    categories = StationCategory.objects.all().order_by('id')
-
-    context = {
-        'categories': categories,
-    }
-    return render(request, 'app/index.html', context)
+    return render(request, 'app/index.html')
 
 
 @login_required
 @csrf_exempt
 def station_list_page(request):
     if request.user.can(Permission.ADMIN):
-        station_list = Station.objects.all().order_by('id')
+        station_list = Station.objects.all()
     else:
         station_list = Station.objects.filter(
             owner_group=request.user.group
-        ).order_by('id')
+        )
+    station_list = station_list.with_listing_data().order_by('id')
 
     paginator = Paginator(station_list, 10)
 
@@ -238,17 +286,10 @@ def station_list_page(request):
         stations = paginator.page(paginator.num_pages)
 
     for station in stations:
-        station.primary_image = StationImage.objects.filter(
-            station=station,
-            is_primary=True
-        ).first()
-        station.beacon = Beacon.objects.filter(
-            station=station
-        ).first()
+        station.beacon = next(iter(station.linked_beacons), None)
 
     context = {
-        'stations': stations,
-        'categories': StationCategory.objects.all().order_by('id')
+        'stations': stations
     }
 
     return render(request, 'app/station_list_page.html', context)
@@ -258,9 +299,10 @@ def station_list_page(request):
 def station_list_by_category_page(request, pk):
     category = get_object_or_404(StationCategory, pk=pk)
     if request.user.can(Permission.ADMIN):
-        station_list = Station.objects.filter(category=category).order_by('id')
+        station_list = Station.objects.filter(category=category)
     else:
-        station_list = Station.objects.filter(owner_group=request.user.group, category=category).order_by('id')
+        station_list = Station.objects.filter(owner_group=request.user.group, category=category)
+    station_list = station_list.with_listing_data().order_by('id')
 
     paginator = Paginator(station_list, 10)
 
@@ -274,17 +316,10 @@ def station_list_by_category_page(request, pk):
         stations = paginator.page(paginator.num_pages)
 
     for station in stations:
-        station.primary_image = StationImage.objects.filter(
-            station=station,
-            is_primary=True
-        ).first()
-        station.beacon = Beacon.objects.filter(
-            station=station
-        ).first()
+        station.beacon = next(iter(station.linked_beacons), None)
 
     context = {
-        'stations': stations,
-        'categories': StationCategory.objects.all().order_by('id')
+        'stations': stations
     }
 
     return render(request, 'app/station_list_page.html', context)
@@ -322,12 +357,22 @@ def station_edit_page(request, pk):
                         image=value,
                         is_primary=False
                     )
+            station.refresh_images()
 
-            # link the reward related to the station
-            station.reward_set.clear()
+            # link the reward related to the station, touching the relinked
+            # rewards so that the delta sync reports them
+            now = timezone.now()
             reward = Reward.objects.filter(id=request.POST.get('reward', -1)).first()
+            Reward.objects.filter(related_station=station).exclude(
+                pk=reward.pk if reward else None
+            ).update(related_station=None, updated_at=now)
             if reward:
-                station.reward_set.add(reward)
+                Reward.objects.filter(pk=reward.pk).exclude(
+                    related_station=station
+                ).update(related_station=station, updated_at=now)
+            # The UPDATEs send no post_save
+            bump_version('app.reward')
+            Station.objects.filter(pk=station.pk).update(updated_at=timezone.now())
 
             return HttpResponseRedirect('/stations/')
 
@@ -359,7 +404,6 @@ def station_edit_page(request, pk):
         return HttpResponseForbidden()
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'beacons': beacon_set,
         'form': form,
         'form_data': form_data,
@@ -379,13 +423,21 @@ def set_primary_station_image(request, pk):
             not request.user.is_administrator()):
         return HttpResponseForbidden()
 
-    station_images = StationImage.objects.filter(station=image.station)
-    for img in station_images:
-        img.is_primary = False
-        img.save()
-
-    image.is_primary = True
-    image.save()
+    # One UPDATE flips the old and the new primary image, the constraint
+    # allowing a single primary image per station is checked on commit
+    with transaction.atomic():
+        StationImage.objects.filter(
+            Q(pk=image.pk) | Q(is_primary=True),
+            station_id=image.station_id
+        ).update(
+            is_primary=Case(
+                When(pk=image.pk, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            updated_at=timezone.now()
+        )
+        image.station.refresh_images()
 
     return HttpResponseRedirect('/stations/{0}/edit/'.format(image.station.id))
 
@@ -402,6 +454,7 @@ def delete_station_image(request, pk):
         if os.path.isfile(image.image.path):
             os.remove(image.image.path)
         image.delete()
+        image.station.refresh_images()
 
         return HttpResponseRedirect('/stations/{0}/edit/'.format(image.station.id))
 
@@ -435,6 +488,7 @@ def station_add_page(request):
                         image=value,
                         is_primary=is_primary
                     )
+            station.refresh_images()
 
             return HttpResponseRedirect('/stations/')
     else:
@@ -450,7 +504,6 @@ def station_add_page(request):
         return HttpResponseForbidden()
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'beacons': beacon_set,
         'form': form,
         'max_imgs': settings.MAX_IMGS_UPLOAD,
@@ -460,6 +513,10 @@ def station_add_page(request):
 
 
 @csrf_exempt
+@condition(
+    etag_func=catalog_etag(REWARD_CATALOG_MODELS),
+    last_modified_func=catalog_last_modified(REWARD_CATALOG_MODELS)
+)
 def get_all_rewards(request):
     """API for retrieving rewards list"""
     data = [
@@ -480,6 +537,10 @@ def get_all_rewards(request):
 
 
 @csrf_exempt
+@condition(
+    etag_func=catalog_etag(STATION_CATALOG_MODELS),
+    last_modified_func=catalog_last_modified(STATION_CATALOG_MODELS)
+)
 def get_all_stations(request):
     """API for retrieving contents of all Stations
 
@@ -498,32 +559,97 @@ def get_all_stations(request):
                 }
             }
 
+        The payload is served from a versioned snapshot which is rebuilt
+        only after a station, station image, reward or category changed.
+        Requests carrying a matching `If-None-Match` or `If-Modified-Since`
+        header are answered with 304.
+
+    """
+    return HttpResponse(
+        get_station_catalog(request),
+        status=200,
+        content_type='application/json; charset=utf-8'
+    )
+
+
+@csrf_exempt
+@require_GET
+def sync(request):
+    """API for retrieving the entries changed since the previous sync
+
+    Query Args:
+        since: the `cursor` returned by the previous sync, omitted for
+            the first sync
+
+    Returns:
+        data: see `app.sync.get_changes`
+
     """
-    stations = Station.objects.all()
-    prefix = 'https://' if request.is_secure() else 'http://'
-    domain = request.get_host()
+    since = request.GET.get('since')
+    if since:
+        try:
+            since = decode_cursor(since)
+        except (ValueError, OverflowError):
+            return HttpResponse('Invalid since cursor', status=400)
+    else:
+        since = None
+
+    return JsonResponse(
+        data=get_changes(since, get_url_prefix(request)),
+        status=200,
+        json_dumps_params={'ensure_ascii': False},
+        content_type='application/json; charset=utf-8'
+    )
+
+
+@csrf_exempt
+@require_GET
+def nearby_stations(request):
+    """API for retrieving the stations closest to a location
+
+    Query Args:
+        lat: latitude of the location
+        lng: longitude of the location
+        radius: maximum distance in meters, NEARBY_STATIONS_RADIUS by default
+        limit: maximum number of stations, NEARBY_STATIONS_LIMIT by default
+        category: id of a station category, may be repeated
+
+    Returns:
+        data (:obj: `list` of :obj: `dict`): closest first, formating with::
+            {
+                'id': station's id,
+                'name': station's name,
+                'category': what category station belongs to,
+                'location': station's location,
+                'distance': distance in meters
+            }
+
+    """
+    try:
+        latitude = float(request.GET['lat'])
+        longitude = float(request.GET['lng'])
+        radius = float(request.GET.get('radius', settings.NEARBY_STATIONS_RADIUS))
+        limit = int(request.GET.get('limit', settings.NEARBY_STATIONS_LIMIT))
+        category_ids = [int(pk) for pk in request.GET.getlist('category')]
+    except (KeyError, ValueError):
+        return HttpResponse('Invalid location input', status=400)
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return HttpResponse('Invalid location input', status=400)
+    if not (0 < radius <= settings.NEARBY_STATIONS_MAX_RADIUS):
+        return HttpResponse('Radius is out of range', status=400)
+    if not (0 < limit <= settings.NEARBY_STATIONS_MAX_LIMIT):
+        return HttpResponse('Limit is out of range', status=400)
+
+    stations = find_nearby_stations(latitude, longitude, radius, limit, category_ids)
 
     data = [
         {
             'id': station.id,
             'name': station.name,
-            'content': station.content,
             'category': str(station.category),
             'location': station.location.get_coords(),
-            'rewards': [reward.id for reward in station.reward_set.all()],
-            'image': {
-                'primary':
-                    '{0}{1}{2}'.format(
-                        prefix,
-                        domain,
-                        station.get_primary_image()
-                    )
-                    if station.get_primary_image() else '',
-                'others': [
-                    '{0}{1}{2}'.format(prefix, domain, image_url)
-                    for image_url in station.get_other_images()
-                ]
-            }
+            'distance': round(station.distance.m, 1),
         }
         for station in stations
     ]
@@ -536,44 +662,124 @@ def get_all_stations(request):
     )
 
 
+@csrf_exempt
+@require_GET
+@condition(
+    etag_func=catalog_etag(STATION_TILE_MODELS),
+    last_modified_func=catalog_last_modified(STATION_TILE_MODELS)
+)
+def station_tile(request, zoom, x, y):
+    """API for retrieving the stations of a web mercator map tile
+
+    The app requests the tiles covering its viewport, so panning only
+    fetches the new tiles and every tile is cached on its own key.
+
+    Returns:
+        data: a json-liked dict formating with::
+            {
+                'zoom': zoom level of the tile,
+                'clustered': whether `data` holds clusters instead of stations,
+                'data': list of
+                    {'id', 'name', 'category', 'location'} of each station or
+                    {'geohash', 'count', 'location'} of each cluster,
+                    `location` being the average location of its stations
+            }
+
+    """
+    zoom, x, y = int(zoom), int(x), int(y)
+    if zoom > MAX_TILE_ZOOM or x >= 2 ** zoom or y >= 2 ** zoom:
+        return HttpResponse('Invalid tile', status=404)
+
+    return HttpResponse(
+        get_station_tile(request, zoom, x, y),
+        status=200,
+        content_type='application/json; charset=utf-8'
+    )
+
+
 @csrf_exempt
 @require_POST
+@api_user_required
 def get_linked_stations(request):
-    """API for retrieving list of stations linked to the Beacon"""
+    """API for retrieving list of stations linked to the Beacon
+
+    The stations are looked up in the in-memory beacon routing table.
+
+    """
     beacon_id = request.POST.get('beacon_id')
-    user_email = request.POST.get('email')
+    user_email = request.api_user_email
 
-    user = User.objects.filter(email=user_email).first()
-    if not user:
+    # The user of a valid token exists, visits of an user deleted since
+    # are dropped when the buffer is flushed
+    if not request.api_user_authenticated and not request.api_user:
         return HttpResponse('User does not exist', status=404)
 
-    beacon = Beacon.objects.filter(beacon_id=beacon_id).first()
-    if beacon:
-        UserVisitedBeacons.objects.create(user=user, beacon=beacon)
+    station_ids = routing_table.get(beacon_id)
+    if station_ids is not None:
+        record_visits(user_email, [(beacon_id, timezone.now())])
 
-    stations = Station.objects.filter(beacon__beacon_id=beacon_id)
-    if not stations:
+    if not station_ids:
         return HttpResponse('No match stations', status=404)
     else:
-        data = [station.id for station in stations]
+        return JsonResponse(data={'data': station_ids}, status=200)
+
+
+@csrf_exempt
+@require_POST
+@api_user_required
+def report_beacon_sightings(request):
+    """API for reporting a batch of beacon sightings
+
+    Record a visit for every sighting and return the stations linked to
+    each sighted beacon, so the app can flush its queue in one request.
+
+    Returns:
+        data (dict): ids of the linked stations keyed by beacon id,
+            unknown beacons are left out
+
+    """
+    user_email = request.api_user_email
+
+    # The user of a valid token exists, visits of an user deleted since
+    # are dropped when the buffer is flushed
+    if not request.api_user_authenticated and not request.api_user:
+        return HttpResponse('User does not exist', status=404)
+
+    try:
+        sightings = parse_sightings(request.POST.get('sightings', ''))
+    except ValueError:
+        return HttpResponse('Invalid sightings input', status=400)
+
+    if len(sightings) > settings.MAX_BEACON_SIGHTINGS:
+        return HttpResponse('Too many sightings in one request', status=400)
+
+    linked_stations = routing_table.get_many(
+        beacon_id for beacon_id, timestamp in sightings
+    )
+    record_visits(user_email, [
+        (beacon_id, timestamp)
+        for beacon_id, timestamp in sightings
+        if beacon_id in linked_stations
+    ])
 
-        return JsonResponse(data={'data': data}, status=200)
+    return JsonResponse(data={'data': linked_stations}, status=200)
 
 
 @csrf_exempt
 @require_POST
+@api_user_required
 def update_user_coins(request):
     coins = request.POST.get('coins')
-    user_email = request.POST.get('email')
+    user_email = request.api_user_email
 
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not coins:
         return HttpResponse('Either user does not exist or coins input is not given', status=404)
 
     try:
         user.earned_coins = coins
-        user.save()
+        user.save(update_fields=['earned_coins'])
     except ValueError:
         return HttpResponse('Invalid input of coins', status=400)
 
@@ -587,18 +793,19 @@ def update_user_coins(request):
 
 @csrf_exempt
 @require_POST
+@api_user_required
 def update_user_experience_point(request):
     experience_point = request.POST.get('experience_point')
-    user_email = request.POST.get('email')
+    user_email = request.api_user_email
 
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not experience_point:
         return HttpResponse('Either user does not exist or experience_point input is not given', status=404)
 
     try:
         user.experience_point = experience_point
-        user.save()
+        user.save(update_fields=['experience_point'])
     except ValueError:
         return HttpResponse('Invalid input of experience point', status=400)
 
@@ -610,14 +817,83 @@ def update_user_experience_point(request):
     return JsonResponse(data=data, status=200)
 
 
+def add_to_user_counters(request, fields):
+    """Add the posted amounts to the counters of the posted user
+
+    Args:
+        fields (dict): User counter field names keyed by POST field name
+
+    """
+    user_email = request.api_user_email
+
+    try:
+        deltas = {
+            field: int(request.POST[key])
+            for key, field in fields.items()
+            if request.POST.get(key)
+        }
+    except ValueError:
+        return HttpResponse('Invalid input of counter amounts', status=400)
+
+    if not user_email or not deltas:
+        return HttpResponse('Either email or counter amounts input is not given', status=400)
+
+    try:
+        # A savepoint keeps the connection usable after an overflow
+        with transaction.atomic():
+            values = User.objects.add_to_counters(user_email, **deltas)
+    except DataError:
+        return HttpResponse('Invalid input of counter amounts', status=400)
+    if values is None:
+        return HttpResponse('User does not exist', status=404)
+
+    data = {
+        'message': 'Counters of {0} update succeed'.format(user_email),
+        'data': {
+            key: values[field]
+            for key, field in fields.items()
+            if field in values
+        }
+    }
+
+    return JsonResponse(data=data, status=200)
+
+
+@csrf_exempt
+@require_POST
+@api_user_required
+def add_user_coins(request):
+    """Add the posted amount of coins to the user, negative to spend coins"""
+    return add_to_user_counters(request, {'coins': 'earned_coins'})
+
+
 @csrf_exempt
 @require_POST
+@api_user_required
+def add_user_experience_point(request):
+    """Add the posted amount of experience point to the user"""
+    return add_to_user_counters(request, {'experience_point': 'experience_point'})
+
+
+@csrf_exempt
+@require_POST
+@api_user_required
+def add_user_counters(request):
+    """Add the posted amounts of coins and experience point in one update"""
+    return add_to_user_counters(request, {
+        'coins': 'earned_coins',
+        'experience_point': 'experience_point',
+    })
+
+
+@csrf_exempt
+@require_POST
+@api_user_required
 def add_user_reward(request):
     """POST a reward id and update the user data"""
-    user_email = request.POST.get('email')
     reward_id = request.POST.get('reward_id')
 
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
     reward = Reward.objects.filter(id=reward_id).first()
 
     if not user or not reward:
@@ -633,12 +909,12 @@ def add_user_reward(request):
 
 @csrf_exempt
 @require_POST
+@api_user_required
 def add_user_favorite_stations(request):
     station_id = request.POST.get('station_id')
-    user_email = request.POST.get('email')
 
     station = Station.objects.filter(id=station_id).first()
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not station:
         return HttpResponse('Either user or station does not exist', status=404)
@@ -674,21 +950,17 @@ def category_add_page(request):
 
             return HttpResponseRedirect('/stations/')
 
-    context = {
-        'categories': StationCategory.objects.all().order_by('id')
-    }
-
-    return render(request, 'app/category_add_page.html', context)
+    return render(request, 'app/category_add_page.html')
 
 
 @csrf_exempt
 @require_POST
+@api_user_required
 def remove_user_favorite_stations(request):
     station_id = request.POST.get('station_id')
-    user_email = request.POST.get('email')
 
     station = Station.objects.filter(id=station_id).first()
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not station:
         return HttpResponse('Either user or station does not exist', status=404)
@@ -706,6 +978,10 @@ def remove_user_favorite_stations(request):
 
 
 @csrf_exempt
+@condition(
+    etag_func=catalog_etag(TRAVEL_PLAN_CATALOG_MODELS),
+    last_modified_func=catalog_last_modified(TRAVEL_PLAN_CATALOG_MODELS)
+)
 def get_all_travel_plans(request):
     data = [
         {
@@ -731,8 +1007,7 @@ def get_all_travel_plans(request):
 def reward_list_page(request):
 
     context = {
-        'rewards': Reward.objects.all(),
-        'categories': StationCategory.objects.all().order_by('id')
+        'rewards': Reward.objects.all()
     }
 
     return render(request, 'app/reward_list_page.html', context)
@@ -747,17 +1022,12 @@ def reward_add_page(request):
             reward_form.save()
 
             context = {
-                'rewards': Reward.objects.all(),
-                'categories': StationCategory.objects.all().order_by('id')
+                'rewards': Reward.objects.all()
             }
 
             return render(request, 'app/reward_list_page.html', context)
 
-    context = {
-        'categories': StationCategory.objects.all().order_by('id')
-    }
-
-    return render(request, 'app/reward_add_page.html', context)
+    return render(request, 'app/reward_add_page.html')
 
 
 @login_required
@@ -784,7 +1054,6 @@ def reward_edit_page(request, pk):
         'image': reward.image
     }
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'stations': stations,
         'form_data': form_data
     }
@@ -815,8 +1084,7 @@ def manager_list_page(request):
         managers = paginator.page(paginator.num_pages)
 
     context = {
-        'managers': managers,
-        'categories': StationCategory.objects.all().order_by('id')
+        'managers': managers
     }
 
     return render(request, 'app/manager_list_page.html', context)
@@ -843,8 +1111,7 @@ def manager_add_page(request):
     context = {
         'roles': roles,
         'groups': groups,
-        'form': form,
-        'categories': StationCategory.objects.all().order_by('id'),
+        'form': form
     }
 
     return render(request, 'app/manager_add_page.html', context)
@@ -885,8 +1152,7 @@ def manager_edit_page(request, pk):
         'roles': roles,
         'groups': groups,
         'form': form,
-        'form_data': form_data,
-        'categories': StationCategory.objects.all().order_by('id'),
+        'form_data': form_data
     }
 
     return render(request, 'app/manager_edit_page.html', context)
@@ -917,13 +1183,83 @@ def beacon_list_page(request):
         beacons = paginator.page(paginator.num_pages)
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'beacons': beacons
     }
 
     return render(request, 'app/beacon_list_page.html', context)
 
 
+@login_required
+@administrator_required
+def beacon_routing_stats(request):
+    """Hit and miss counters of the beacon routing table of this process"""
+    return JsonResponse(data=routing_table.stats(), status=200)
+
+
+@login_required
+@administrator_required
+def beacon_auto_link_page(request):
+    """Review and apply the links of every beacon to its nearest stations
+
+    The plan is computed again on POST and only applied if it is still
+    the one the administrator reviewed.
+
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    try:
+        radius = float(params.get('radius', settings.BEACON_AUTO_LINK_RADIUS))
+        count = int(params.get('stations', settings.BEACON_AUTO_LINK_STATIONS))
+    except ValueError:
+        return HttpResponse('Invalid radius or number of stations', status=400)
+    if radius <= 0 or count < 1:
+        return HttpResponse('Invalid radius or number of stations', status=400)
+
+    # The routing tables are invalidated when this transaction commits
+    with transaction.atomic():
+        changes = plan_beacon_links(radius, count)
+        if request.method == 'POST':
+            if request.POST.get('fingerprint') == fingerprint(changes):
+                apply_beacon_links(changes)
+                return HttpResponseRedirect('/beacons/')
+            messages.warning(request, 'The links changed meanwhile, please review them again!')
+
+    context = {
+        'radius': radius,
+        'stations': count,
+        'changes': changes,
+        'fingerprint': fingerprint(changes),
+    }
+    return render(request, 'app/beacon_auto_link_page.html', context)
+
+
+@login_required
+@administrator_required
+def visit_dashboard_page(request):
+    """Footfall of the beacons and stations, read from the visit rollups only"""
+    period = request.GET.get('period', VisitRollup.DAY)
+    if period not in dict(VisitRollup.PERIODS):
+        period = VisitRollup.DAY
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        days = 7
+    # Hourly rows of long ranges would not fit on the page
+    days = max(1, min(days, 7 if period == VisitRollup.HOUR else 366))
+
+    since = timezone.now() - timedelta(days=days)
+    since = since.replace(minute=0, second=0, microsecond=0)
+    if period == VisitRollup.DAY:
+        since = since.replace(hour=0)
+
+    context = {
+        'period': period,
+        'days': days,
+        'timeline': get_visit_timeline(period, since),
+        'top_stations': get_top_stations(since),
+    }
+    return render(request, 'app/visit_dashboard_page.html', context)
+
+
 @login_required
 @administrator_required
 def beacon_add_page(request):
@@ -1006,7 +1342,6 @@ def station_delete_page(request, pk):
 @login_required
 def travelplan_list_page(request):
     context = {
-        'categories': StationCategory.objects.all(),
         'travelplans': TravelPlan.objects.all().order_by('id')
     }
 
@@ -1022,7 +1357,6 @@ def travelplan_add_page(request):
             travelplan_form.save()
 
             context = {
-                'categories': StationCategory.objects.all().order_by('id'),
                 'travelplans': TravelPlan.objects.all()
             }
 
@@ -1031,7 +1365,6 @@ def travelplan_add_page(request):
         travelplan_form = PartialTravelPlanForm()
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'form': travelplan_form
     }
 
@@ -1050,39 +1383,18 @@ def travelplan_edit_page(request, pk):
         )
 
         if travelplan_form.is_valid():
-            edited_travelplan = travelplan_form.save()
-            json_order = json.loads(request.POST['order'])
-            exist_travelplan_stations = [
-                travelplan_station.station_id
-                for travelplan_station in TravelPlanStations.objects.filter(travelplan_id=pk)
-            ]
-
-            for order, station_id in enumerate(json_order):
-                changed_travelplan = TravelPlanStations.objects.filter(
-                    travelplan_id=pk,
-                    station_id=station_id
-                )
-                if not changed_travelplan:
-                    TravelPlanStations.objects.create(
-                        travelplan_id=pk,
-                        station_id=station_id,
-                        order=order
-                    )
-                else:
-                    changed_travelplan.first().order = order
-                    changed_travelplan.first().save()
-                    exist_travelplan_stations.remove(int(station_id))
+            try:
+                station_ids = [
+                    int(station_id)
+                    for station_id in json.loads(request.POST['order'])
+                ]
+            except (KeyError, TypeError, ValueError):
+                return HttpResponse('Invalid station order', status=400)
 
-            for station_id in exist_travelplan_stations:
-                TravelPlanStations.objects.filter(
-                    travelplan=travelplan,
-                    station_id=station_id
-                ).delete()
-
-            context = {
-                'categories': StationCategory.objects.all().order_by('id'),
-                'travelplans': TravelPlan.objects.all()
-            }
+            with transaction.atomic():
+                travelplan_form.save()
+                travelplan.set_station_order(station_ids)
+            bump_version('app.travelplan')
 
             return HttpResponseRedirect('/travelplans/')
         form_data = travelplan_form.cleaned_data
@@ -1101,8 +1413,7 @@ def travelplan_edit_page(request, pk):
         'stations': Station.objects.exclude(travelplanstations__travelplan_id=pk),
         'travelplan': travelplan,
         'selected_stations': selected_stations,
-        'form_data': form_data,
-        'categories': StationCategory.objects.all().order_by('id')
+        'form_data': form_data
     }
 
     return render(request, 'app/travelplan_edit_page.html', context)
@@ -1134,7 +1445,6 @@ def group_list_page(request):
         groups = paginator.page(paginator.num_pages)
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'groups': groups
     }
 
@@ -1156,11 +1466,7 @@ def group_add_page(request):
         else:
             messages.warning(request, 'Group name input is not given!')
 
-    context = {
-        'categories': StationCategory.objects.all()
-    }
-
-    return render(request, 'app/group_add_page.html', context)
+    return render(request, 'app/group_add_page.html')
 
 
 @login_required
@@ -1182,7 +1488,6 @@ def group_edit_page(request, pk):
             messages.warning(request, 'Group name input is not given!')
 
     context = {
-        'categories': StationCategory.objects.all(),
         'group': group_instance.name
     }
 
@@ -1211,8 +1516,7 @@ def question_list_page(request):
         questions = paginator.page(paginator.num_pages)
 
     context = {
-        'questions': questions,
-        'categories': StationCategory.objects.all().order_by('id')
+        'questions': questions
     }
 
     return render(request, 'app/question_list_page.html', context)
@@ -1254,7 +1558,6 @@ def question_add_page(request):
         stations = Station.objects.filter(owner_group=request.user.group)
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'stations': stations.order_by('id')
     }
     return render(request, 'app/question_add_page.html', context)
@@ -1321,7 +1624,6 @@ def question_edit_page(request, pk):
     }
 
     context = {
-        'categories': StationCategory.objects.all().order_by('id'),
         'form': form,
         'form_data': form_data,
         'stations': stations
@@ -1343,12 +1645,13 @@ def station_search_page(request):
     if request.user.can(Permission.ADMIN):
         station_list = Station.objects.filter(
             name__contains=query
-        ).order_by('id')
+        )
     else:
         station_list = Station.objects.filter(
             name__contains=query,
             owner_group=request.user.group
-        ).order_by('id')
+        )
+    station_list = station_list.with_listing_data().order_by('id')
 
     paginator = Paginator(station_list, 10)
 
@@ -1361,17 +1664,10 @@ def station_search_page(request):
         stations = paginator.page(paginator.num_pages)
 
     for station in stations:
-        station.primary_image = StationImage.objects.filter(
-            station=station,
-            is_primary=True
-        ).first()
-        station.beacon = Beacon.objects.filter(
-            station=station
-        ).first()
+        station.beacon = next(iter(station.linked_beacons), None)
 
     context = {
-        'stations': stations,
-        'categories': StationCategory.objects.all().order_by('id')
+        'stations': stations
     }
 
     return render(request, 'app/station_list_page.html', context)
@@ -1397,7 +1693,6 @@ def beacon_search_page(request):
         beacons = paginator.page(paginator.num_pages)
 
     context = {
-        'categories': StationCategory.objects.all(),
         'beacons': beacons
     }
 
@@ -1415,31 +1710,30 @@ def group_delete_page(request, pk):
 
 @require_GET
 @csrf_exempt
+@api_user_required
 def get_unanswered_question(request):
     station_id = request.GET.get('station_id')
-    user_email = request.GET.get('email')
 
     station = Station.objects.filter(id=station_id).first()
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not station:
         return HttpResponse('Either user or station does not exist', status=400)
 
-    unanswered_questions = Question.objects.exclude(
-        user__pk=user_email
-    ).filter(linked_station=station)
-
-    if not unanswered_questions:
+    picked = pick_unanswered_question(user.pk, station.id)
+    if picked is None:
         return JsonResponse(data={}, status=200)
 
-    random_index = random.randint(0, unanswered_questions.count() - 1)
-    random_unanswered_question = random.sample(list(unanswered_questions), 1)[0]
-
-    choices = []
-    for i, choice in enumerate(Choice.objects.filter(question=random_unanswered_question)):
-        choices.append(choice.content)
-        if choice.is_answer:
-            index = i + 1
+    random_unanswered_question, question_choices = picked
+    choices = [choice.content for choice in question_choices]
+    index = next(
+        (
+            order
+            for order, choice in enumerate(question_choices, start=1)
+            if choice.is_answer
+        ),
+        None
+    )
 
     return JsonResponse(
         data={
@@ -1456,17 +1750,18 @@ def get_unanswered_question(request):
 
 @require_POST
 @csrf_exempt
+@api_user_required
 def add_answered_question(request):
     question_id = request.POST.get('question_id')
-    user_email = request.POST.get('email')
 
     question = Question.objects.filter(id=question_id).first()
-    user = User.objects.filter(email=user_email).first()
+    user = request.api_user
 
     if not user or not question:
         return HttpResponse('Either user or question does not exist', status=400)
 
     user.answered_questions.add(question)
+    add_answered_question_id(user.pk, question.id)
 
     return HttpResponse('Add answered question succeeded', status=200)
 
@@ -1556,8 +1851,7 @@ def manager_edit_self_page(request, pk):
 
     context = {
         'form': form,
-        'form_data': form_data,
-        'categories': StationCategory.objects.all().order_by('id'),
+        'form_data': form_data
     }
 
     return render(request, 'app/manager_edit_self_page.html', context)
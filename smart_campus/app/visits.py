@@ -0,0 +1,289 @@
+from django.conf import settings
+from django.db import close_old_connections, transaction, IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+
+from .models import Beacon, User, UserVisitedBeacons
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = '.spool'
+PENDING_SUFFIX = '.pending'
+
+
+def parse_sightings(raw):
+    """Parse the sightings posted by the app
+
+    Args:
+        raw (str): json array formatting with::
+            [
+                {'beacon_id': $beacon_id, 'timestamp': ISO 8601 datetime},
+                ...
+            ]
+            `timestamp` is optional and defaults to now.
+
+    Returns:
+        list of tuple: (beacon_id, timestamp) of each sighting
+
+    Raises:
+        ValueError: if the input is malformed
+
+    """
+    items = json.loads(raw)
+    if not isinstance(items, list):
+        raise ValueError('sightings should be a list')
+
+    now = timezone.now()
+    sightings = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('beacon_id'):
+            raise ValueError('Each sighting needs a beacon_id')
+
+        timestamp = now
+        if item.get('timestamp'):
+            timestamp = parse_datetime(str(item['timestamp']))
+            if timestamp is None:
+                raise ValueError('Invalid timestamp')
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp, timezone.utc)
+            # Never trust a clock running ahead of the server
+            timestamp = min(timestamp, now)
+
+        sightings.append((str(item['beacon_id']), timestamp))
+
+    return sightings
+
+
+def _append_to_spool(path, data):
+    """Append to a spool file, following it if it was renamed meanwhile
+
+    A drainer renames a spool file before it locks and reads it, so a
+    writer which opened the old name has to write to a fresh file instead.
+
+    The data is flushed to the operating system, which keeps it when the
+    process is killed, but not synced to the disk: the file is loaded into
+    the database within seconds, which syncs it once for all the pings
+    written meanwhile.
+
+    """
+    while True:
+        with open(path, 'a') as spool:
+            fcntl.flock(spool, fcntl.LOCK_EX)
+            try:
+                if (os.path.exists(path) and
+                        os.fstat(spool.fileno()).st_ino == os.stat(path).st_ino):
+                    spool.write(data)
+                    spool.flush()
+                    return
+            finally:
+                fcntl.flock(spool, fcntl.LOCK_UN)
+
+
+def _insert_visits(rows):
+    """Insert the visits, skipping those of deleted users or beacons"""
+    visits = [
+        UserVisitedBeacons(
+            user_id=user_id,
+            beacon_id=beacon_id,
+            timestamp=parse_datetime(timestamp)
+        )
+        for user_id, beacon_id, timestamp in rows
+    ]
+
+    try:
+        with transaction.atomic():
+            UserVisitedBeacons.objects.bulk_create(visits, batch_size=1000)
+    except IntegrityError:
+        user_ids = set(User.objects.filter(
+            pk__in={visit.user_id for visit in visits}
+        ).values_list('pk', flat=True))
+        beacon_ids = set(Beacon.objects.filter(
+            pk__in={visit.beacon_id for visit in visits}
+        ).values_list('pk', flat=True))
+        with transaction.atomic():
+            UserVisitedBeacons.objects.bulk_create([
+                visit
+                for visit in visits
+                if visit.user_id in user_ids and visit.beacon_id in beacon_ids
+            ], batch_size=1000)
+
+
+def load_spool_file(path):
+    """Insert the visits of a renamed spool file and delete it
+
+    The file is only deleted after its visits are committed, so a crash
+    in between replays them later: delivery is at least once.
+
+    Returns:
+        int: number of visits read from the file
+
+    """
+    with open(path) as spool:
+        # Wait for a writer which still holds the file before the rename
+        fcntl.flock(spool, fcntl.LOCK_EX)
+        rows = [json.loads(line) for line in spool if line.strip()]
+        fcntl.flock(spool, fcntl.LOCK_UN)
+
+    if rows:
+        _insert_visits(rows)
+    os.remove(path)
+    return len(rows)
+
+
+def _claim(path):
+    """Rename a spool file so that no writer appends to it anymore
+
+    Returns:
+        str: the new path, None if another process claimed it first
+
+    """
+    pending = '{0}.{1}{2}'.format(path, uuid.uuid4().hex, PENDING_SUFFIX)
+    try:
+        os.rename(path, pending)
+    except FileNotFoundError:
+        return None
+    return pending
+
+
+def drain_spool(spool_dir=None):
+    """Load every spool file, including those left by stopped processes
+
+    Returns:
+        int: number of visits read from the spool files
+
+    """
+    spool_dir = spool_dir or settings.VISIT_SPOOL_DIR
+    if not os.path.isdir(spool_dir):
+        return 0
+
+    count = 0
+    for name in sorted(os.listdir(spool_dir)):
+        path = os.path.join(spool_dir, name)
+        if name.endswith(SPOOL_SUFFIX):
+            path = _claim(path)
+        elif not name.endswith(PENDING_SUFFIX):
+            continue
+        if path:
+            count += load_spool_file(path)
+    return count
+
+
+class VisitBuffer(object):
+    """Write-behind buffer of the UserVisitedBeacons rows
+
+    Visits are appended to a per-process spool file before the response,
+    and inserted with one bulk_create by a background thread every
+    `max_age` seconds, or as soon as `size` visits are spooled. A spool
+    file is only deleted after its visits are committed, so delivery is at
+    least once: the files of killed workers and of failed inserts are
+    loaded by the `flush_visits` command.
+
+    """
+    def __init__(self, spool_dir, size, max_age):
+        self.spool_dir = spool_dir
+        self.size = size
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.count = 0
+        self.pid = None
+
+    @property
+    def path(self):
+        # Resolved lazily, uWSGI forks its workers after loading the app
+        return os.path.join(
+            self.spool_dir,
+            'visits-{0}{1}'.format(os.getpid(), SPOOL_SUFFIX)
+        )
+
+    def _start(self):
+        # Threads do not survive a fork, each worker starts its own
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.count = 0
+            os.makedirs(self.spool_dir, exist_ok=True)
+            thread = threading.Thread(target=self._run, name='visit-buffer')
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.max_age)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def add(self, user_id, sightings):
+        """Spool the visits of an user
+
+        Args:
+            user_id (str): primary key of the user
+            sightings (list of tuple): (beacon_id, timestamp) of existing beacons
+
+        """
+        if not sightings:
+            return
+
+        data = ''.join(
+            json.dumps([user_id, beacon_id, timestamp.isoformat()]) + '\n'
+            for beacon_id, timestamp in sightings
+        )
+
+        with self.lock:
+            self._start()
+            _append_to_spool(self.path, data)
+            self.count += len(sightings)
+            if self.count >= self.size:
+                self.wakeup.set()
+
+    def flush(self):
+        """Insert the spooled visits of this process"""
+        with self.lock:
+            if not self.count:
+                return
+            pending = _claim(self.path)
+            self.count = 0
+
+        if pending:
+            try:
+                load_spool_file(pending)
+            except Exception:
+                # The file stays in the spool directory for `flush_visits`
+                logger.exception('Failed to flush the visit buffer')
+
+
+visit_buffer = VisitBuffer(
+    settings.VISIT_SPOOL_DIR,
+    settings.VISIT_BUFFER_SIZE,
+    settings.VISIT_BUFFER_MAX_AGE
+)
+atexit.register(visit_buffer.flush)
+
+
+def record_visits(user_id, sightings):
+    """Record the visits of an user
+
+    The visits go through the write-behind buffer unless it is disabled
+    by `VISIT_BUFFER_ENABLED`, in which case they are inserted at once.
+
+    Args:
+        user_id (str): primary key of the user
+        sightings (list of tuple): (beacon_id, timestamp) of existing beacons
+
+    """
+    if settings.VISIT_BUFFER_ENABLED:
+        visit_buffer.add(user_id, sightings)
+        return
+
+    UserVisitedBeacons.objects.bulk_create([
+        UserVisitedBeacons(user_id=user_id, beacon_id=beacon_id, timestamp=timestamp)
+        for beacon_id, timestamp in sightings
+    ])
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.APITokenMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,7 +75,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'django.template.context_processors.media'
+                'django.template.context_processors.media',
+                'app.context_processors.categories'
             ],
         },
     },
@@ -82,6 +84,42 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'smart_campus.wsgi.application'
 
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/1.11/topics/http/sessions/#configuring-the-session-engine
+#
+# Chosen with the SESSION_BACKEND environment variable:
+# - cached_db: read from the cache, written through to the database (default)
+# - cache: only in the cache, which has to be shared by the processes
+# - signed_cookies: kept by the browser, a logout does not revoke a copied cookie
+# - file: one file per session under SESSION_FILE_PATH
+# - db: only in the database
+
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'file': 'django.contrib.sessions.backends.file',
+    'db': 'django.contrib.sessions.backends.db',
+}
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cached_db')
+
+if SESSION_BACKEND not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        'SESSION_BACKEND should be one of {}'.format(', '.join(sorted(SESSION_ENGINES)))
+    )
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -131,6 +169,89 @@ LOGIN_URL = '/login/'
 
 MAX_IMGS_UPLOAD = 8
 
+# Scheme and host of the absolute urls in the mobile API payloads, e.g.
+# 'https://example.com'. The host of each request is used if empty, which
+# builds a catalog snapshot per Host header.
+
+API_URL_PREFIX = ''
+
+# Deletions are reported by the delta sync API for this many days,
+# clients which synced before that have to do a full sync
+
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+# The sync cursor is moved back by this many seconds, longer than any
+# transaction writing the catalog, so that rows committed after the
+# cursor was taken are still returned; clients replace entries by id
+
+SYNC_CURSOR_OVERLAP_SECONDS = 300
+
+# Upper bound of sightings accepted by one report_beacon_sightings request
+
+MAX_BEACON_SIGHTINGS = 500
+
+# Default and maximum radius in meters and number of stations of the
+# nearby_stations API, keeping its responses small
+
+NEARBY_STATIONS_RADIUS = 500
+NEARBY_STATIONS_MAX_RADIUS = 5000
+NEARBY_STATIONS_LIMIT = 10
+NEARBY_STATIONS_MAX_LIMIT = 50
+
+# Station map tiles list their stations from STATION_TILE_CLUSTER_ZOOM on
+# unless they hold more than STATION_TILE_MAX_STATIONS, otherwise they
+# count the stations per geohash cell. Tiles are cached for
+# STATION_TILE_CACHE_TIMEOUT seconds, or until a station changes.
+
+STATION_TILE_CLUSTER_ZOOM = 16
+STATION_TILE_MAX_STATIONS = 200
+STATION_TILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Default radius in meters and number of stations of the beacon
+# auto-linking, see "manage.py auto_link_beacons"
+
+BEACON_AUTO_LINK_RADIUS = 50
+BEACON_AUTO_LINK_STATIONS = 1
+
+# Authentication tokens of the mobile app expire after API_TOKEN_MAX_AGE
+# seconds. Tokens are signed with the first of API_TOKEN_SECRET_KEYS
+# (SECRET_KEY if empty) and accepted with any of them. Until
+# API_TOKEN_REQUIRED is set, the API also accepts a posted email from
+# app versions which do not send tokens.
+
+API_TOKEN_MAX_AGE = 60 * 60 * 24 * 30
+API_TOKEN_SECRET_KEYS = []
+API_TOKEN_REQUIRED = False
+
+# Write-behind buffer of the beacon visits: spooled to VISIT_SPOOL_DIR,
+# then inserted with one bulk INSERT by a background thread every
+# VISIT_BUFFER_MAX_AGE seconds or once VISIT_BUFFER_SIZE visits are
+# spooled. Run "manage.py flush_visits" after stopping the server to
+# insert what is left.
+
+VISIT_BUFFER_ENABLED = True
+VISIT_BUFFER_SIZE = 200
+VISIT_BUFFER_MAX_AGE = 10
+VISIT_SPOOL_DIR = '/var/tmp/smartcampus/visits'
+
+# Hours of rollups rebuilt again by "manage.py rollup_visits" to count
+# the visits inserted late, e.g. by apps which were offline
+
+VISIT_ROLLUP_LOOKBACK_HOURS = 48
+
+# Monthly partitions of the visit log created ahead by
+# "manage.py manage_visit_partitions", and months of raw visits kept
+# before their partitions are detached; the rollups keep the aggregates
+
+VISIT_PARTITION_PREMAKE_MONTHS = 3
+VISIT_RETENTION_MONTHS = 24
+
+# Seconds the question ids of a station and the answered question ids
+# of an user are cached. The former are also dropped whenever a question
+# changes, the latter are updated whenever the user answers.
+
+QUESTION_CACHE_TIMEOUT = 3600
+
 # the folder specified by media_root
 
 MEDIA_URL = '/media/'
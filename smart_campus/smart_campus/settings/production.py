@@ -6,6 +6,9 @@ SECRET_KEY = get_env_variable('SECRET_KEY')
 
 ALLOWED_HOSTS = ['*']
 
+# Any Host header is accepted, keep the urls of the API payloads fixed
+API_URL_PREFIX = 'https://smartcampus.csie.ncku.edu.tw'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.contrib.gis.db.backends.postgis',
@@ -17,4 +20,19 @@ DATABASES = {
     },
 }
 
+# Shared by all uWSGI processes so that catalog snapshots and their
+# invalidation are seen by every worker. memcached evicts the least
+# recently used keys without scanning, and its incr is atomic, which the
+# change counters rely on. The station catalog is larger than the default
+# 1 MB item size, start memcached with e.g. "-I 8m".
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('MEMCACHED_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
+SESSION_FILE_PATH = '/var/tmp/smartcampus/sessions'
+
 MEDIA_ROOT = '/var/www/smartcampus.csie.ncku.edu.tw/media'
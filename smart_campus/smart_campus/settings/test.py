@@ -16,3 +16,7 @@ DATABASES = {
         'PORT':  get_env_variable('POSTGRESQL_PORT'),
     },
 }
+
+# Insert the visits immediately so tests can see them
+
+VISIT_BUFFER_ENABLED = False
@@ -70,6 +70,10 @@ urlpatterns = [
     # Beacons
     url(r'^beacons/$', app.views.beacon_list_page,
         name='Beacon List Page'),
+    url(r'^visits/$', app.views.visit_dashboard_page,
+        name='Visit Dashboard Page'),
+    url(r'^beacons/auto_link/$', app.views.beacon_auto_link_page,
+        name='Beacon Auto Link Page'),
     url(r'^beacons/new/$', app.views.beacon_add_page,
         name='Beacon Add Page'),
     url(r'^beacons/(?P<pk>[^/]+)/edit/$', app.views.beacon_edit_page,
@@ -78,6 +82,8 @@ urlpatterns = [
         name='Beacon Delete Page'),
     url(r'beacons/search$', app.views.beacon_search_page,
         name='Beacon Search Page'),
+    url(r'^beacons/routing_stats/$', app.views.beacon_routing_stats,
+        name='Beacon Routing Stats'),
 
     url(r'^travelplans/$', app.views.travelplan_list_page,
         name='TravelPlan List Page'),
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.utils import timezone
+
+from app.analytics import rollup_visits
+from app.models import (
+    Beacon, Station, User, UserVisitedBeacons,
+    BeaconVisitRollup, StationVisitRollup
+)
+
+
+def visit(user, beacon, hour, minute=0):
+    UserVisitedBeacons.objects.create(
+        user=user,
+        beacon=beacon,
+        timestamp=datetime(2017, 11, 20, hour, minute, tzinfo=timezone.utc)
+    )
+
+
+@pytest.mark.django_db
+class TestRollupVisits:
+    def setup_method(self, method):
+        self.station = Station.objects.create(name='library')
+        self.beacon = Beacon.objects.create(
+            beacon_id='b1', name='beacon 1', location=Point(x=120.22, y=22.99)
+        )
+        self.beacon.station.add(self.station)
+        self.alice = User.objects.create(email='alice@example.com')
+        self.bob = User.objects.create(email='bob@example.com')
+
+    def test_hourly_and_daily_counts(self):
+        visit(self.alice, self.beacon, 9)
+        visit(self.alice, self.beacon, 9, 30)
+        visit(self.bob, self.beacon, 10)
+
+        rollup_visits()
+
+        assert list(BeaconVisitRollup.objects.filter(
+            period='hour'
+        ).order_by('start').values_list('visits', 'visitors')) == [(2, 1), (1, 1)]
+        assert list(StationVisitRollup.objects.filter(
+            period='day'
+        ).values_list('station', 'visits', 'visitors')) == [(self.station.id, 3, 2)]
+
+    def test_late_visits_are_counted_again(self):
+        visit(self.alice, self.beacon, 9)
+        rollup_visits()
+
+        # Inserted late, within the lookback of the last rollup
+        visit(self.bob, self.beacon, 8)
+        rollup_visits()
+
+        day = BeaconVisitRollup.objects.get(period='day')
+        assert (day.visits, day.visitors) == (2, 2)
+        assert day.start == datetime(2017, 11, 20, tzinfo=timezone.utc)
+        assert BeaconVisitRollup.objects.filter(period='hour').count() == 2
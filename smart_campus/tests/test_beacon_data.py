@@ -0,0 +1,58 @@
+import pytest
+
+from app.beacon_data import import_beacons
+from app.models import Beacon, UserGroup
+from app.readers import read_chunks
+
+
+def make_row(beacon_id, name, latitude=22.99, group='group'):
+    return {
+        'Beacon ID': beacon_id,
+        'idname': name,
+        'description': float('nan'),
+        'Latitude': latitude,
+        'Longitude': 120.22,
+        'OwnerGroup': group,
+    }
+
+
+@pytest.mark.django_db
+class TestImportBeacons:
+    def test_dry_run_saves_nothing(self):
+        counts = import_beacons([[make_row('b1', 'beacon 1')]], dry_run=True)
+
+        assert counts['created'] == 1
+        assert not Beacon.objects.exists()
+
+    def test_diff_against_existing_beacons(self):
+        group = UserGroup.objects.create(name='group')
+        import_beacons([[make_row('b1', 'beacon 1'), make_row('b2', 'beacon 2')]])
+
+        counts = import_beacons([
+            [make_row('b1', 'beacon 1'), make_row('b2', 'beacon 2', latitude=23.0)],
+            [make_row('b3', 'beacon 3', group='missing')],
+        ])
+
+        assert (counts['created'], counts['updated'], counts['unchanged']) == (1, 1, 1)
+        assert counts['unknown_groups'] == {'missing'}
+        assert Beacon.objects.get(pk='b1').owner_group == group
+        assert Beacon.objects.get(pk='b1').description == ''
+        assert Beacon.objects.get(pk='b2').location.y == 23.0
+        assert Beacon.objects.get(pk='b3').owner_group is None
+
+
+def test_read_csv_in_chunks(tmpdir):
+    path = tmpdir.join('beacons.csv')
+    path.write_text(
+        '\ufeffBeacon ID,idname,Latitude\n'
+        'b1,beacon 1,22.99\n'
+        ',,\n'
+        'b2,beacon 2,22.99\n'
+        'b3,beacon 3,22.99\n',
+        encoding='utf-8'
+    )
+
+    chunks = list(read_chunks(str(path), 2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0][0] == {'Beacon ID': 'b1', 'idname': 'beacon 1', 'Latitude': '22.99'}
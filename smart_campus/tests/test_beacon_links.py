@@ -0,0 +1,35 @@
+import pytest
+from django.contrib.gis.geos import Point
+
+from app.beacon_links import plan_beacon_links, apply_beacon_links
+from app.models import Beacon, Station
+
+
+@pytest.mark.django_db
+class TestBeaconAutoLink:
+    def test_beacons_are_linked_to_the_nearest_station(self):
+        near = Station.objects.create(name='near', location=Point(x=120.2200, y=22.9900))
+        far = Station.objects.create(name='far', location=Point(x=120.2300, y=22.9900))
+        beacon = Beacon.objects.create(
+            beacon_id='b1', name='beacon 1', location=Point(x=120.2201, y=22.9900)
+        )
+        beacon.station.add(far)
+        lonely = Beacon.objects.create(
+            beacon_id='b2', name='beacon 2', location=Point(x=121.0, y=23.5)
+        )
+        lonely.station.add(far)
+
+        changes = plan_beacon_links(radius=50, count=1)
+
+        assert changes == [{
+            'beacon_id': 'b1',
+            'beacon_name': 'beacon 1',
+            'added': [(near.id, 'near')],
+            'removed': [(far.id, 'far')],
+        }]
+
+        apply_beacon_links(changes)
+
+        assert list(beacon.station.all()) == [near]
+        assert list(lonely.station.all()) == [far]
+        assert plan_beacon_links(radius=50, count=1) == []
@@ -0,0 +1,76 @@
+import pytest
+
+from app.catalog_data import import_stations, import_questions, import_travel_plans
+from app.models import Choice, Question, Station, StationCategory, TravelPlan
+
+
+STATIONS = [
+    {'name': 'library', 'category': 'building', 'latitude': 22.99, 'longitude': 120.22},
+    {'name': 'lake', 'category': 'scenery', 'latitude': 23.0, 'longitude': 120.21},
+]
+
+
+@pytest.mark.django_db
+class TestCatalogImport:
+    def test_stations_are_matched_by_name(self):
+        StationCategory.objects.create(name='building')
+
+        counts = import_stations([STATIONS])
+        assert (counts['created'], counts['unknown']) == (2, {'category scenery'})
+
+        counts = import_stations([[dict(STATIONS[0], content='books')], STATIONS[1:]])
+        assert (counts['created'], counts['updated'], counts['unchanged']) == (0, 1, 1)
+        assert Station.objects.get(name='library').content == 'books'
+        assert Station.objects.get(name='library').category.name == 'building'
+
+    def test_new_station_without_coordinates_aborts_the_import(self):
+        with pytest.raises(ValueError):
+            import_stations([[STATIONS[0], {'name': 'nowhere', 'content': 'lost'}]])
+
+        assert not Station.objects.exists()
+
+    def test_missing_coordinates_keep_the_location(self):
+        import_stations([STATIONS])
+
+        counts = import_stations([[{'name': 'library', 'category': 'building', 'content': 'books'}]])
+
+        assert counts['updated'] == 1
+        assert Station.objects.get(name='library').location.coords == (120.22, 22.99)
+
+    def test_questions_are_idempotent(self):
+        import_stations([STATIONS])
+        row = {
+            'content': 'Which one?',
+            'station': 'library',
+            'choice_1': 'this',
+            'choice_2': 'that',
+            'answer': '2',
+        }
+
+        import_questions([[row]])
+        counts = import_questions([[row]])
+
+        assert (counts['created'], counts['unchanged']) == (0, 1)
+        question = Question.objects.get()
+        assert question.linked_station.name == 'library'
+        assert list(Choice.objects.filter(
+            question=question
+        ).order_by('id').values_list('content', 'is_answer')) == [('this', False), ('that', True)]
+
+    def test_unknown_station_aborts_the_import(self):
+        with pytest.raises(ValueError):
+            import_travel_plans([[{'name': 'tour', 'stations': ['nowhere']}]])
+
+        assert not TravelPlan.objects.exists()
+
+    def test_travel_plan_order_is_updated(self):
+        import_stations([STATIONS])
+        import_travel_plans([[{'name': 'tour', 'stations': 'library|lake'}]])
+
+        counts = import_travel_plans([[{'name': 'tour', 'stations': ['lake', 'library']}]])
+
+        assert counts['updated'] == 1
+        assert [
+            travelplanstation.station.name
+            for travelplanstation in TravelPlan.objects.get().travelplanstations_set.all()
+        ] == ['lake', 'library']
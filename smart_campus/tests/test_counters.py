@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from django.db import connection, transaction, DataError
+
+from app.models import User
+
+
+@pytest.mark.django_db
+class TestAddToCounters:
+    def setup_method(self, method):
+        self.user = User.objects.create(email='alice@example.com', earned_coins=10)
+
+    def test_sequential_increments_add_up(self):
+        User.objects.add_to_counters('alice@example.com', earned_coins=5)
+        values = User.objects.add_to_counters(
+            'alice@example.com', earned_coins=2, experience_point=3
+        )
+
+        assert values == {'earned_coins': 17, 'experience_point': 3}
+        # The stale instance is not written back
+        self.user.refresh_from_db()
+        assert (self.user.earned_coins, self.user.experience_point) == (17, 3)
+
+    def test_negative_delta_decreases_the_counter(self):
+        values = User.objects.add_to_counters('alice@example.com', earned_coins=-4)
+
+        assert values == {'earned_coins': 6}
+
+    def test_unknown_user_returns_none(self):
+        assert User.objects.add_to_counters('bob@example.com', earned_coins=1) is None
+
+    def test_unknown_field_is_rejected(self):
+        with pytest.raises(ValueError):
+            User.objects.add_to_counters('alice@example.com', password=1)
+
+    def test_overflow_raises_data_error(self):
+        with pytest.raises(DataError), transaction.atomic():
+            User.objects.add_to_counters('alice@example.com', earned_coins=2 ** 31)
+
+        self.user.refresh_from_db()
+        assert self.user.earned_coins == 10
+
+    def test_overflow_is_a_bad_request(self, client):
+        response = client.post('/smart_campus/add_user_coins/', {
+            'email': 'alice@example.com',
+            'coins': str(2 ** 31),
+        })
+
+        assert response.status_code == 400
+        self.user.refresh_from_db()
+        assert self.user.earned_coins == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_increments_are_not_lost():
+    User.objects.create(email='alice@example.com')
+
+    def add_coins():
+        try:
+            for _ in range(20):
+                User.objects.add_to_counters('alice@example.com', earned_coins=1)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=add_coins) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert User.objects.get(email='alice@example.com').earned_coins == 80
@@ -0,0 +1,18 @@
+import pytest
+from django.contrib.gis.geos import Point
+
+from app.models import Station
+from app.spatial import find_nearby_stations
+
+
+@pytest.mark.django_db
+def test_nearest_station_in_meters_comes_first():
+    # At latitude 23 a degree of longitude is shorter than one of
+    # latitude: east is nearer in meters, north is nearer in degrees
+    east = Station.objects.create(name='east', location=Point(x=120.2210, y=23.0))
+    Station.objects.create(name='north', location=Point(x=120.2200, y=23.00095))
+
+    stations = find_nearby_stations(23.0, 120.2200, radius=500, limit=1)
+
+    assert [station.id for station in stations] == [east.id]
+    assert 100 < stations[0].distance.m < 104
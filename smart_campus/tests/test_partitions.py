@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.models import Beacon, User, UserVisitedBeacons
+from app.partitions import (
+    add_months, month_of, partition_name, is_partitioned, list_partitions,
+    create_partition, detach_partition
+)
+
+
+def test_add_months_across_years():
+    assert add_months(date(2017, 11, 1), 3) == date(2018, 2, 1)
+    assert add_months(date(2018, 1, 1), -1) == date(2017, 12, 1)
+    assert add_months(date(2018, 1, 1), -24) == date(2016, 1, 1)
+
+
+def test_partition_name_of_a_visit():
+    month = month_of(datetime(2017, 11, 20, 8, tzinfo=timezone.utc))
+    assert month == date(2017, 11, 1)
+    assert partition_name(month) == 'app_uservisitedbeacons_y2017m11'
+
+
+@pytest.mark.django_db
+class TestPartitions:
+    def setup_method(self, method):
+        if not is_partitioned():
+            pytest.skip('The visit log is only partitioned on PostgreSQL 11 or later')
+        self.user = User.objects.create(email='alice@example.com')
+        self.beacon = Beacon.objects.create(
+            beacon_id='b1', name='beacon 1', location=Point(x=120.22, y=22.99)
+        )
+
+    def test_late_partition_takes_the_rows_of_the_default_one(self):
+        month = date(2100, 1, 1)
+        UserVisitedBeacons.objects.create(
+            user=self.user,
+            beacon=self.beacon,
+            timestamp=datetime(2100, 1, 15, tzinfo=timezone.utc)
+        )
+
+        create_partition(month)
+
+        assert month in list_partitions()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM {0}'.format(partition_name(month)))
+            assert cursor.fetchone()[0] == 1
+        assert UserVisitedBeacons.objects.count() == 1
+
+    def test_detached_partition_does_not_block_deletes(self):
+        month = date(2100, 2, 1)
+        create_partition(month)
+        UserVisitedBeacons.objects.create(
+            user=self.user,
+            beacon=self.beacon,
+            timestamp=datetime(2100, 2, 15, tzinfo=timezone.utc)
+        )
+
+        detach_partition(month)
+
+        assert month not in list_partitions()
+        assert not UserVisitedBeacons.objects.exists()
+        with transaction.atomic():
+            self.user.delete()
+            self.beacon.delete()
+            # Foreign keys are deferred, check them now
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
@@ -0,0 +1,11 @@
+import pytest
+
+from app.query_plans import explain_hot_queries
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes():
+    reports = explain_hot_queries(disable_seqscan=True)
+
+    assert [report['label'] for report in reports if report['seq_scans']] == []
+    assert all(report['plan'] for report in reports)
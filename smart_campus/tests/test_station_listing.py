@@ -0,0 +1,50 @@
+import pytest
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Beacon, Station, StationCategory, StationImage
+
+
+def create_stations(count):
+    category = StationCategory.objects.create(name='category')
+    for i in range(count):
+        station = Station.objects.create(
+            name='station {0}'.format(i),
+            category=category,
+            location=Point(x=120.22, y=22.99)
+        )
+        StationImage.objects.create(
+            station=station,
+            image='images/station/{0}.png'.format(i),
+            is_primary=True
+        )
+        StationImage.objects.create(
+            station=station,
+            image='images/station/{0}-other.png'.format(i),
+            is_primary=False
+        )
+        station.refresh_images()
+        beacon = Beacon.objects.create(
+            beacon_id='beacon {0}'.format(i),
+            name='beacon {0}'.format(i),
+            location=Point(x=120.22, y=22.99)
+        )
+        beacon.station.add(station)
+
+
+def count_listing_queries(size):
+    with CaptureQueriesContext(connection) as context:
+        for station in Station.objects.with_listing_data().order_by('id')[:size]:
+            assert station.category.name == 'category'
+            assert station.get_primary_image().endswith('.png')
+            assert station.linked_beacons[0].name.startswith('beacon')
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestStationListingQueries:
+    def test_query_count_does_not_grow_with_page_size(self):
+        create_stations(12)
+
+        assert count_listing_queries(1) == count_listing_queries(12) == 2
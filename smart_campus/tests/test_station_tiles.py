@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+
+from app.models import Station
+from app.spatial import build_station_tile, tile_bounds
+
+
+# Zoom 16 tile holding the NCKU campus
+ZOOM, X, Y = 16, 54653, 28465
+
+
+def test_tile_bounds():
+    assert tile_bounds(0, 0, 0) == pytest.approx((-180, -85.0511, 180, 85.0511), abs=1e-4)
+    assert tile_bounds(1, 1, 0) == pytest.approx((0, 0, 180, 85.0511), abs=1e-4)
+
+
+@pytest.mark.django_db
+class TestStationTile:
+    def setup_method(self, method):
+        west, south, east, north = tile_bounds(ZOOM, X, Y)
+        for i in range(3):
+            Station.objects.create(
+                name='station {0}'.format(i),
+                location=Point(x=west + (east - west) * (i + 1) / 4, y=(south + north) / 2)
+            )
+        Station.objects.create(name='elsewhere', location=Point(x=121.5, y=25.0))
+
+    def test_stations_are_listed_at_high_zoom(self):
+        tile = json.loads(build_station_tile(ZOOM, X, Y).decode('utf-8'))
+
+        assert not tile['clustered']
+        assert [station['name'] for station in tile['data']] == [
+            'station 0', 'station 1', 'station 2'
+        ]
+
+    @override_settings(STATION_TILE_MAX_STATIONS=2)
+    def test_crowded_tiles_are_clustered(self):
+        tile = json.loads(build_station_tile(ZOOM, X, Y).decode('utf-8'))
+
+        assert tile['clustered']
+        assert sum(cluster['count'] for cluster in tile['data']) == 3
@@ -0,0 +1,73 @@
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from app.middleware import APITokenMiddleware
+from app.models import User
+from app.tokens import api_token
+
+
+ALICE = User(email='alice@example.com')
+
+
+class TestAPIToken:
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'])
+    def test_token_carries_the_email(self):
+        assert api_token.check_token(api_token.make_token(ALICE)) == 'alice@example.com'
+
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'], API_TOKEN_MAX_AGE=60)
+    def test_expired_token_is_rejected(self, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(time, 'time', lambda: now - 61)
+        token = api_token.make_token(ALICE)
+        monkeypatch.setattr(time, 'time', lambda: now)
+
+        assert api_token.check_token(token) is None
+
+    def test_token_of_a_rotated_key_is_accepted(self):
+        with override_settings(API_TOKEN_SECRET_KEYS=['old key']):
+            token = api_token.make_token(ALICE)
+
+        with override_settings(API_TOKEN_SECRET_KEYS=['new key', 'old key']):
+            assert api_token.check_token(token) == 'alice@example.com'
+            assert api_token.make_token(ALICE) != token
+
+        with override_settings(API_TOKEN_SECRET_KEYS=['new key']):
+            assert api_token.check_token(token) is None
+
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'])
+    def test_tampered_token_is_rejected(self):
+        token = api_token.make_token(ALICE)
+        payload, timestamp, signature = token.split(':')
+
+        assert api_token.check_token('{0}:{1}:{2}'.format(payload, timestamp, signature[::-1])) is None
+        assert api_token.check_token('garbage') is None
+
+
+class TestAPITokenMiddleware:
+    def setup_method(self, method):
+        self.middleware = APITokenMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'])
+    def test_valid_token_sets_the_email(self):
+        request = self.factory.get(
+            '/', HTTP_AUTHORIZATION='Token ' + api_token.make_token(ALICE)
+        )
+
+        assert self.middleware(request).status_code == 200
+        assert request.api_user_email == 'alice@example.com'
+
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'])
+    def test_invalid_token_is_unauthorized(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token garbage')
+
+        assert self.middleware(request).status_code == 401
+
+    @override_settings(API_TOKEN_SECRET_KEYS=['new key'])
+    def test_request_without_token_passes_through(self):
+        request = self.factory.get('/')
+
+        assert self.middleware(request).status_code == 200
+        assert request.api_user_email is None